@@ -4,7 +4,15 @@ import uuid
 import json
 import os
 from datetime import datetime
-from services.ai_analyzer import analyze_text
+from services.ai_analyzer import analyze_text, analyze_texts, cache_stats, readiness, warmup
+from services.analysis_queue import QUEUED, AnalysisQueue, analysis_fields, analysis_status
+from services.duplicates import DuplicateIndex
+from storage import GroupCommitWriter, open_store
+from storage.cache import ParsedFileCache
+from storage.pagination import paginate, parse_filters
+from storage.rollups import GRANULARITIES, parse_bound
+from utils.conditional import not_modified, store_etag, with_etag
+from utils.streaming import stream_records, wants_ndjson
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 from datetime import datetime, timedelta
@@ -33,32 +41,69 @@ USERS_FILE = BASE_DIR / 'data' / 'users.json'
 # Ensure data directory exists
 DATA_DIR.mkdir(exist_ok=True)
 
-# Initialize complaints file if it doesn't exist
-if not COMPLAINTS_FILE.exists():
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump([], f, indent=2)
+# Complaint store (JSON file, append-only log or SQLite, see COMPLAINT_STORAGE)
+complaints_store = open_store(COMPLAINTS_FILE)
+
+# Concurrent submissions are committed together by a single writer thread
+complaint_writer = GroupCommitWriter(
+    complaints_store,
+    window=float(os.getenv('COMPLAINT_GROUP_COMMIT_MS', '0')) / 1000,
+    max_batch=int(os.getenv('COMPLAINT_GROUP_COMMIT_MAX', '256')),
+)
+
+# Recent complaints by MinHash signature, to link resubmissions to the original
+duplicate_index = DuplicateIndex(
+    complaints_store,
+    threshold=float(os.getenv('DUPLICATE_THRESHOLD', '0.8')),
+    window_days=float(os.getenv('DUPLICATE_WINDOW_DAYS', '30')),
+)
+
+# ASYNC_ANALYSIS=1: complaints are stored right away with aiAnalysis.status
+# 'queued' and analyzed in batches by background threads
+async_analysis = os.getenv('ASYNC_ANALYSIS', '0') == '1'
+analysis_queue = AnalysisQueue(
+    complaints_store,
+    analyze_texts,
+    workers=int(os.getenv('ANALYSIS_QUEUE_WORKERS', '1')),
+    max_batch=int(os.getenv('ANALYSIS_QUEUE_BATCH', '64')),
+)
+
+# Held by the one worker that re-queues complaints left queued; see AnalysisQueue.resume
+ANALYSIS_RESUME_LOCK = DATA_DIR / 'analysis_resume.lock'
+
+# Longest a GET /api/complaints/<id>/analysis?wait= request is held open
+ANALYSIS_WAIT_MAX = 30.0
 
 # Initialize users file if it doesn't exist
 if not USERS_FILE.exists():
     with open(USERS_FILE, 'w') as f:
         json.dump([], f, indent=2)
 
+# Parsed users.json, re-read only when another worker has rewritten it
+users_cache = ParsedFileCache(USERS_FILE)
+
 @app.route('/api/health')
 def health_check():
     return jsonify({'status': 'healthy'})
 
-# Load users from JSON file
+@app.route('/api/ready')
+def readiness_check():
+    # Unlike /api/health, only 200 once this worker has warmed up the model
+    status = readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/analyzer/cache', methods=['GET'])
+def get_analyzer_cache():
+    # Counters are per worker process; `pid` tells which one answered
+    return jsonify({'success': True, 'cache': cache_stats()})
+
+# Load users from JSON file (shared cached list, do not modify in place)
 def load_users():
-    try:
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return users_cache.get()
 
 # Save users to JSON file
 def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    users_cache.write(users)
 
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -84,8 +129,7 @@ def register():
         'createdAt': datetime.utcnow().isoformat()
     }
 
-    users.append(new_user)
-    save_users(users)
+    save_users(users + [new_user])
 
     return jsonify({'message': 'User registered successfully', 'user': {'id': new_user['id'], 'email': new_user['email'], 'name': new_user['name'], 'role': new_user['role']}}), 201
 
@@ -152,119 +196,263 @@ def create_complaint():
     if not data or not data.get('title') or not data.get('description') or not data.get('contactInfo'):
         return jsonify({'error': 'Title, description, and contactInfo are required'}), 400
 
-    complaints = []
-    try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-    except FileNotFoundError:
-        pass  # Handle case where file doesn't exist yet
+    # Combine title and description for better analysis
+    full_text = f"{data['title']}. {data['description']}"
+
+    # A near-duplicate of a recent complaint reuses its analysis instead of rerunning the models
+    original = duplicate_index.find(full_text)
+    if original is not None:
+        duplicate_of = original.get('duplicateOf') or original['id']
+        new_complaint = {
+            'id': str(uuid.uuid4()),
+            'title': data['title'],
+            'description': data['description'],
+            'contactInfo': data['contactInfo'],
+            'category': original.get('category'),
+            'department': original.get('department'),
+            'priority': original.get('priority'),
+            'userType': data.get('userType', 'Student'),
+            'domain': data.get('domain', 'default'),
+            'status': 'pending',
+            'createdAt': datetime.utcnow().isoformat(),
+            'duplicateOf': duplicate_of,
+            'aiAnalysis': original.get('aiAnalysis', {}),
+        }
+        complaint_writer.insert(new_complaint)
+        if analysis_status(new_complaint) == QUEUED:
+            # The original is still being analyzed; analyze this one too
+            analysis_queue.submit(new_complaint['id'], full_text)
+        return jsonify({
+            'message': 'Complaint submitted successfully',
+            'id': new_complaint['id'],
+            'duplicateOf': duplicate_of,
+            'analysis': {
+                'category': new_complaint['category'],
+                'priority': new_complaint['priority'],
+                'department': new_complaint['department'],
+                **new_complaint['aiAnalysis'],
+            },
+        }), 201
+
+    if async_analysis:
+        # Stored with the submitted (or default) fields; the analysis patches them
+        new_complaint = {
+            'id': str(uuid.uuid4()),
+            'title': data['title'],
+            'description': data['description'],
+            'contactInfo': data['contactInfo'],
+            'category': data.get('category', 'General'),
+            'department': data.get('department', ''),
+            'priority': data.get('priority', 'Medium'),
+            'userType': data.get('userType', 'Student'),
+            'domain': data.get('domain', 'default'),
+            'status': 'pending',
+            'createdAt': datetime.utcnow().isoformat(),
+            'aiAnalysis': {'status': QUEUED},
+        }
+        complaint_writer.insert(new_complaint)
+        analysis_queue.submit(new_complaint['id'], full_text)
+        return jsonify({
+            'message': 'Complaint submitted successfully',
+            'id': new_complaint['id'],
+            'analysis': {'status': QUEUED},
+        }), 201
 
-    # Use AI to analyze the complaint
+    # Use AI to analyze the complaint; the same fields the background queue stores
     try:
-        # Combine title and description for better analysis
-        full_text = f"{data['title']}. {data['description']}"
-        ai_analysis = analyze_text(full_text)
-        
-        category = ai_analysis.get('category', 'General')
-        priority = ai_analysis.get('priority', 'Medium')
-        department = ai_analysis.get('assignedDepartment', '')
-        complaint_type = ai_analysis.get('type', 'General')
-        confidence = ai_analysis.get('confidence', 0)
-        
+        analysis = analysis_fields(analyze_text(full_text))
     except Exception as e:
         # Fallback to default values if AI analysis fails
         print(f"AI Analysis failed: {e}")
-        category = data.get('category', 'General')
-        priority = data.get('priority', 'Medium')
-        department = data.get('department', '')
-        complaint_type = 'General'
-        confidence = 0
+        analysis = {
+            'category': data.get('category', 'General'),
+            'department': data.get('department', ''),
+            'priority': data.get('priority', 'Medium'),
+            'aiAnalysis': {
+                'type': 'General',
+                'confidence': 0,
+                'modelVersion': None,
+                'analyzedAt': datetime.utcnow().isoformat()
+            }
+        }
 
     new_complaint = {
         'id': str(uuid.uuid4()),
         'title': data['title'],
         'description': data['description'],
         'contactInfo': data['contactInfo'],
-        'category': category,
-        'department': department,
-        'priority': priority,
+        'category': analysis['category'],
+        'department': analysis['department'],
+        'priority': analysis['priority'],
         'userType': data.get('userType', 'Student'),
         'domain': data.get('domain', 'default'),
         'status': 'pending',
         'createdAt': datetime.utcnow().isoformat(),
-        'aiAnalysis': {
-            'type': complaint_type,
-            'confidence': confidence,
-            'analyzedAt': datetime.utcnow().isoformat()
-        }
+        'aiAnalysis': analysis['aiAnalysis'],
     }
 
-    complaints.append(new_complaint)
-
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump(complaints, f, indent=2)
+    complaint_writer.insert(new_complaint)
 
     return jsonify({'message': 'Complaint submitted successfully', 'id': new_complaint['id']}), 201
 
 @app.route('/api/complaints', methods=['GET'])
 def get_complaints():
+    # Unchanged store, same query and format: answer 304 without reading
+    etag = store_etag(complaints_store, 'complaints', request.query_string, wants_ndjson())
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    try:
+        # status/category/priority/department/domain and a from/to createdAt range
+        filters, start, end = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    limit = request.args.get('limit')
+    if limit is None:
+        # Stream the full listing (or all matches, in createdAt order) straight from the store
+        if filters or start or end:
+            records = complaints_store.query(filters, start, end)
+        else:
+            records = complaints_store.iter_records()
+        response = stream_records(records, prefix='{"success":true,"data":[', suffix=']}')
+        return with_etag(response, etag)
+
+    # Cursor pagination ordered by (createdAt, id); `next` is null on the last page
+    try:
+        complaints, next_cursor = paginate(complaints_store, int(limit), request.args.get('cursor'),
+                                           filters, start, end)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return with_etag(jsonify({'success': True, 'data': complaints, 'next': next_cursor}), etag), 200
+
+@app.route('/api/complaints/search', methods=['GET'])
+def search_complaints():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Query parameter q is required'}), 400
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-        return jsonify({'success': True, 'data': complaints}), 200
-    except FileNotFoundError:
-        return jsonify({'success': False, 'data': []}), 200
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= 100:
+        return jsonify({'success': False, 'error': 'limit must be between 1 and 100'}), 400
+
+    # BM25-ranked from the store's inverted index, best match first
+    results = complaints_store.search(query, limit)
+    data = [{**complaint, 'score': round(score, 4)} for complaint, score in results]
+    return jsonify({'success': True, 'data': data}), 200
+
+@app.route('/api/complaints/<id>', methods=['GET'])
+def get_complaint(id):
+    complaint = complaints_store.get(id)
+    if not complaint:
+        return jsonify({'error': 'Complaint not found'}), 404
+    return jsonify({'success': True, 'data': complaint}), 200
+
+@app.route('/api/complaints/<id>/analysis', methods=['GET'])
+def get_complaint_analysis(id):
+    # ?wait=<seconds> holds the request until the analysis is done (long poll)
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), ANALYSIS_WAIT_MAX)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'wait must be a number of seconds'}), 400
+    complaint = analysis_queue.wait(id, wait)
+    if not complaint:
+        return jsonify({'error': 'Complaint not found'}), 404
+    return jsonify({
+        'success': True,
+        'id': complaint['id'],
+        'status': analysis_status(complaint),
+        'analysis': {
+            'category': complaint.get('category'),
+            'priority': complaint.get('priority'),
+            'department': complaint.get('department'),
+            **(complaint.get('aiAnalysis') or {}),
+        },
+    }), 200
+
+@app.route('/api/complaints/<id>', methods=['PATCH'])
+def update_complaint(id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No fields to update'}), 400
+
+    complaint = complaints_store.update(id, data)
+    if not complaint:
+        return jsonify({'error': 'Complaint not found'}), 404
+    return jsonify({'success': True, 'data': complaint}), 200
 
 @app.route('/api/complaints/<id>', methods=['DELETE'])
 def delete_complaint(id):
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-        
-        # Find and remove the complaint with the given ID
-        original_length = len(complaints)
-        complaints = [c for c in complaints if c.get('id') != id]
-        
-        if len(complaints) == original_length:
+        if not complaints_store.delete(id):
             return jsonify({'error': 'Complaint not found'}), 404
         
-        # Save the updated complaints list
-        with open(COMPLAINTS_FILE, 'w') as f:
-            json.dump(complaints, f, indent=2)
-        
         return jsonify({'message': 'Complaint deleted successfully'}), 200
-    except FileNotFoundError:
-        return jsonify({'error': 'Complaints file not found'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
+    etag = store_etag(complaints_store, 'analytics')
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    status_counts = complaints_store.count_by('status')
+    category_distribution = {}
+    for category, count in complaints_store.count_by('category').items():
+        category = category or 'Other'
+        category_distribution[category] = category_distribution.get(category, 0) + count
+
+    analytics_data = {
+        'total_complaints': sum(status_counts.values()),
+        'resolved_count': status_counts.get('resolved', 0),
+        'pending_count': status_counts.get('pending', 0),
+        'category_distribution': category_distribution
+    }
+    return with_etag(jsonify(analytics_data), etag), 200
+
+TIMESERIES_GROUPS = ('category', 'priority', 'department', 'domain', 'status')
+
+@app.route('/api/analytics/timeseries', methods=['GET'])
+def get_analytics_timeseries():
+    granularity = request.args.get('granularity', 'day')
+    group_by = request.args.get('groupBy')
+    if granularity not in GRANULARITIES:
+        return jsonify({'success': False, 'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    if group_by is not None and group_by not in TIMESERIES_GROUPS:
+        return jsonify({'success': False, 'error': f"groupBy must be one of {', '.join(TIMESERIES_GROUPS)}"}), 400
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-
-        total_complaints = len(complaints)
-        resolved_count = sum(1 for c in complaints if c['status'] == 'resolved')
-        pending_count = sum(1 for c in complaints if c['status'] == 'pending')
-
-        category_distribution = {}
-        for c in complaints:
-            category = c.get('category', 'Other')
-            if category in category_distribution:
-                category_distribution[category] += 1
-            else:
-                category_distribution[category] = 1
-
-        analytics_data = {
-            'total_complaints': total_complaints,
-            'resolved_count': resolved_count,
-            'pending_count': pending_count,
-            'category_distribution': category_distribution
-        }
-        return jsonify(analytics_data), 200
-    except FileNotFoundError:
-        return jsonify({'error': 'Complaints file not found'}), 500
+        start = parse_bound(request.args.get('from'))
+        end = parse_bound(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    etag = store_etag(complaints_store, 'timeseries', request.query_string)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # Answered from the stores' hourly rollups; every complaint has one status
+    buckets = complaints_store.rollup(group_by or 'status', granularity, start, end)
+    series = []
+    for bucket in sorted(buckets):
+        point = {'bucket': bucket, 'total': sum(buckets[bucket].values())}
+        if group_by:
+            counts = {}
+            for value, n in buckets[bucket].items():
+                key = 'Other' if value is None else str(value)
+                counts[key] = counts.get(key, 0) + n
+            point['counts'] = counts
+        series.append(point)
+    data = {'success': True, 'granularity': granularity, 'groupBy': group_by,
+            'from': start, 'to': end, 'data': series}
+    return with_etag(jsonify(data), etag), 200
 
 if __name__ == '__main__':
+    warmup()
+    analysis_queue.resume()
     app.run(debug=True, port=5001)
@@ -0,0 +1,76 @@
+"""
+Throughput of the complaint analyzer, one text at a time vs batched.
+
+Run from the backend directory:
+
+    python bench_analyzer.py
+    python bench_analyzer.py --count 5000 --chunk-size 256
+    ANALYZE_BATCH_MS=2 python bench_analyzer.py --threads 32
+
+Texts are the stored complaints, topped up with random phrases of
+model vocabulary (of their own words, for a hashed model) until there are
+--count of them.
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Time the model, not the analysis cache (set ANALYSIS_CACHE_SIZE to include it)
+os.environ.setdefault('ANALYSIS_CACHE_SIZE', '0')
+
+from services.ai_analyzer import MODELS_DIR, analyze_text, analyze_texts
+from services.complaint_model import CHUNK_SIZE, load_model, vocabulary
+from services.text import complaint_text
+from storage import open_store
+
+COMPLAINTS_FILE = Path(__file__).parent / 'data' / 'complaints.json'
+
+
+def _texts(count, seed):
+    texts = [text for text in map(complaint_text, open_store(COMPLAINTS_FILE).iter_records()) if text.strip()]
+    rng = random.Random(seed)
+    terms = sorted(vocabulary(load_model(MODELS_DIR)) or {word for text in texts for word in text.split()})
+    while len(texts) < count:
+        texts.append(' '.join(rng.choices(terms, k=rng.randint(8, 40))))
+    return texts[:count]
+
+
+def _time(label, run, count):
+    started = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.3f}s {count / elapsed:10.0f} texts/s {elapsed / count * 1e6:8.1f} us/text")
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Complaint analyzer throughput")
+    parser.add_argument('--count', type=int, default=2000, help="Texts to analyze (default: 2000)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"Texts per batched model pass (default: {CHUNK_SIZE})")
+    parser.add_argument('--threads', type=int, default=16,
+                        help="Concurrent analyze_text callers, micro-batched together (default: 16)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    texts = _texts(args.count, args.seed)
+    analyze_text(texts[0])  # load the model outside the timings
+
+    single, single_time = _time("analyze_text (one by one)", lambda: [analyze_text(t) for t in texts], len(texts))
+    batched, batched_time = _time(f"analyze_texts (chunks of {args.chunk_size})",
+                                  lambda: analyze_texts(texts, args.chunk_size), len(texts))
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        concurrent, _ = _time(f"analyze_text ({args.threads} threads)",
+                              lambda: list(pool.map(analyze_text, texts)), len(texts))
+
+    if single != batched or single != concurrent:
+        raise SystemExit("Batched results differ from the one-by-one results")
+    print(f"Speedup: {single_time / batched_time:.1f}x, results identical")
+
+
+if __name__ == '__main__':
+    main()
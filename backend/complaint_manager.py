@@ -1,98 +1,83 @@
-import json
 import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from storage import ComplaintStore, open_store, storage_backend
+from storage.domain_store import DOMAIN_FILES, DomainJsonStore
+
 # Base data directory
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# Domain to filename mapping
-DOMAIN_FILES = {
-    'education': 'education_complaints.json',
-    'healthcare': 'healthcare_complaints.json',
-    'business': 'business_complaints.json',
-    'default': 'other_complaints.json'
-}
+def open_manager_store(data_dir: str) -> ComplaintStore:
+    """Store for ComplaintManager as selected by COMPLAINT_STORAGE.
+
+    The `json` backend is one JSON file per domain. The other backends keep all
+    domains in `domain_complaints.*` and are seeded from the domain files.
+    """
+    domain_store = DomainJsonStore(Path(data_dir))
+    if storage_backend() == 'json':
+        return domain_store
+    return open_store(Path(data_dir) / 'domain_complaints.json', seed=domain_store)
 
 class ComplaintManager:
-    def __init__(self, data_dir: str = DATA_DIR):
-        """Initialize the complaint manager with the data directory."""
+    def __init__(self, data_dir: str = DATA_DIR, store: Optional[ComplaintStore] = None):
+        """Initialize the complaint manager with the data directory or an explicit store."""
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
-        
-        # Initialize all domain files if they don't exist
-        for domain, filename in DOMAIN_FILES.items():
-            filepath = os.path.join(self.data_dir, filename)
-            if not os.path.exists(filepath):
-                with open(filepath, 'w') as f:
-                    json.dump([], f)
-    
-    def _get_domain_file(self, domain: str) -> str:
-        """Get the file path for a given domain."""
-        filename = DOMAIN_FILES.get(domain.lower(), DOMAIN_FILES['default'])
-        return os.path.join(self.data_dir, filename)
-    
+        self.store = store or open_manager_store(self.data_dir)
+
     def get_complaints(self, domain: Optional[str] = None) -> List[Dict]:
         """Get all complaints, optionally filtered by domain."""
         if domain:
-            filepath = self._get_domain_file(domain)
-            try:
-                with open(filepath, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return []
-        else:
-            all_complaints = []
-            for domain_file in DOMAIN_FILES.values():
-                filepath = os.path.join(self.data_dir, domain_file)
-                if os.path.exists(filepath):
-                    try:
-                        with open(filepath, 'r') as f:
-                            domain_complaints = json.load(f)
-                            all_complaints.extend(domain_complaints)
-                    except (json.JSONDecodeError, FileNotFoundError):
-                        continue
-            return all_complaints
-    
+            return list(self.store.find(domain=domain))
+        return self.store.all()
+
+    def _next_id(self, domain: str) -> str:
+        """Next sequential id for a domain, e.g. EDU-0003."""
+        prefix = f"{domain[:3].upper()}-"
+        numbers = [
+            int(str(c['id'])[len(prefix):])
+            for c in self.store.find(domain=domain)
+            if str(c.get('id', '')).startswith(prefix) and str(c['id'])[len(prefix):].isdigit()
+        ]
+        return f"{prefix}{max(numbers, default=0) + 1:04d}"
+
     def save_complaint(self, complaint_data: Dict, domain: str = 'default') -> Dict:
         """Save a new complaint to the appropriate domain file."""
         if 'domain' in complaint_data:
             domain = complaint_data['domain']
-        
-        filepath = self._get_domain_file(domain)
-        
-        # Load existing complaints
-        try:
-            with open(filepath, 'r') as f:
-                complaints = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            complaints = []
-        
+
         # Add metadata
         complaint = {
-            "id": f"{domain[:3].upper()}-{len(complaints) + 1:04d}",
+            "id": self._next_id(domain),
             "domain": domain,
             "timestamp": datetime.now().isoformat(),
             **{k: v for k, v in complaint_data.items() if k != 'domain'}
         }
-        
-        # Save updated complaints
-        complaints.append(complaint)
-        with open(filepath, 'w') as f:
-            json.dump(complaints, f, indent=2)
-        
-        return complaint
-    
+
+        return self.store.insert(complaint)
+
     def get_complaint_by_id(self, complaint_id: str) -> Optional[Dict]:
         """Get a specific complaint by its ID."""
-        for domain in list(DOMAIN_FILES.keys()) + ['default']:
-            complaints = self.get_complaints(domain)
-            for complaint in complaints:
-                if complaint.get('id') == complaint_id:
-                    return complaint
-        return None
+        return self.store.get(complaint_id)
+
+    def search_complaints(self, query: str, limit: int = 10) -> List[Dict]:
+        """Complaints best matching a full-text query on title and description."""
+        return [complaint for complaint, _ in self.store.search(query, limit)]
+
+    def update_complaint(self, complaint_id: str, changes: Dict) -> Optional[Dict]:
+        """Update fields of a complaint; None if it does not exist."""
+        return self.store.update(complaint_id, changes)
+
+    def delete_complaint(self, complaint_id: str) -> bool:
+        """Delete a complaint; False if it does not exist."""
+        return self.store.delete(complaint_id)
+
+    def rebuild_index(self) -> int:
+        """Rebuild the store's id index from its data."""
+        return self.store.rebuild_index()
 
 # Create a global instance for easy import
 complaint_manager = ComplaintManager()
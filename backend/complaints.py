@@ -37,3 +37,28 @@ def get_complaint_by_id(complaint_id):
         dict: The complaint data if found, None otherwise
     """
     return complaint_manager.get_complaint_by_id(complaint_id)
+
+def update_complaint(complaint_id, changes):
+    """
+    Update fields of an existing complaint.
+    
+    Args:
+        complaint_id (str): The ID of the complaint to update
+        changes (dict): The fields to change
+        
+    Returns:
+        dict: The updated complaint if found, None otherwise
+    """
+    return complaint_manager.update_complaint(complaint_id, changes)
+
+def delete_complaint(complaint_id):
+    """
+    Delete a complaint.
+    
+    Args:
+        complaint_id (str): The ID of the complaint to delete
+        
+    Returns:
+        bool: True if the complaint was deleted, False if it was not found
+    """
+    return complaint_manager.delete_complaint(complaint_id)
@@ -1,4 +1,49 @@
+import gc
+import os
+
 workers = 4
-worker_class = 'uvicorn.workers.UvicornWorker'
+# Threaded workers so concurrent submissions in a worker share group commits
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
 timeout = 120
 bind = '0.0.0.0:10000'  # Render will use PORT environment variable
+
+# Import the app (and load the complaint model) once in the master. Workers
+# are forked from it, so they start without unpickling anything and share
+# the model's pages instead of each holding a private copy.
+preload_app = True
+
+# No collections in the master while the app is imported, so long-lived
+# objects are not scattered between freed holes; see gc.freeze()
+gc.disable()
+
+
+def when_ready(server):
+    from services.ai_analyzer import preload
+
+    preload()
+    # Keep everything loaded so far out of the workers' collections, which
+    # would otherwise write to (and un-share) every page holding an object
+    gc.freeze()
+    # Frozen objects are skipped from now on, so the master can collect again
+    # (it would otherwise leak the cycles it makes while managing workers)
+    gc.enable()
+    server.log.info("Complaint model preloaded, %d objects frozen", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    # Already on since when_ready; kept in case a worker is forked before it
+    gc.enable()
+
+
+def post_worker_init(worker):
+    # Runs before the worker accepts requests, so none of them waits for the
+    # first prediction; /api/ready reports the outcome
+    from app import ANALYSIS_RESUME_LOCK, analysis_queue
+    from services.ai_analyzer import warmup
+
+    warmup()
+    # Complaints left queued when a previous worker exited, re-queued by one
+    # worker only; a complaint still queued by a live worker may be analyzed
+    # twice, but only the first result is stored
+    analysis_queue.resume(ANALYSIS_RESUME_LOCK)
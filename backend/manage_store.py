@@ -0,0 +1,89 @@
+"""
+Maintenance commands for the complaint stores.
+
+Run from the backend directory, with the same COMPLAINT_STORAGE setting as
+the server:
+
+    python manage_store.py rebuild-index
+    python manage_store.py compact
+    python manage_store.py recount
+    python manage_store.py rebuild-index --file ../sbackend/camplaint-analyzer/data/complaints.json
+"""
+import argparse
+from pathlib import Path
+
+from complaint_manager import open_manager_store
+from storage import open_store
+from storage.base import COUNTED_FIELDS
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR / 'data'
+COMPLAINTS_FILE = DATA_DIR / 'complaints.json'
+
+
+def _stores(args):
+    """The stores selected by --file, plus the ComplaintManager store."""
+    stores = [open_store(path) for path in args.file]
+    if not args.skip_manager:
+        stores.append(open_manager_store(str(DATA_DIR)))
+    return stores
+
+
+def _describe(store):
+    return getattr(store, 'path', None) or getattr(store, 'data_dir', None)
+
+
+def rebuild_index(args):
+    for store in _stores(args):
+        if not hasattr(store, 'rebuild_index'):
+            print(f"{_describe(store)}: {type(store).__name__} has no id index, skipping")
+            continue
+        count = store.rebuild_index()
+        print(f"Rebuilt index for {_describe(store)}: {count} complaints")
+
+
+def compact(args):
+    for store in _stores(args):
+        if not hasattr(store, 'compact'):
+            print(f"{_describe(store)}: {type(store).__name__} does not need compaction, skipping")
+            continue
+        count = store.compact()
+        print(f"Compacted {_describe(store)}: {count} live complaints")
+
+
+def recount(args):
+    for store in _stores(args):
+        if not hasattr(store, 'recount'):
+            print(f"{_describe(store)}: {type(store).__name__} keeps no counters, skipping")
+            continue
+        before = {field: store.count_by(field) for field in COUNTED_FIELDS}
+        after = store.recount()
+        drifted = [field for field in COUNTED_FIELDS if before[field] != after.get(field, {})]
+        if drifted:
+            print(f"Repaired counters for {_describe(store)}: {', '.join(drifted)} had drifted")
+        else:
+            print(f"Verified counters for {_describe(store)}: {store.count()} complaints")
+
+
+COMMANDS = {
+    'rebuild-index': rebuild_index,
+    'compact': compact,
+    'recount': recount,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Complaint store maintenance")
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--file', action='append', type=Path,
+                        help="Legacy complaints JSON path the store is opened from "
+                             "(default: data/complaints.json, may be repeated)")
+    parser.add_argument('--skip-manager', action='store_true',
+                        help="Leave the ComplaintManager (per-domain) store alone")
+    args = parser.parse_args()
+    args.file = args.file or [COMPLAINTS_FILE]
+    COMMANDS[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
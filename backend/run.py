@@ -1,7 +1,12 @@
-from app import app
+from app import analysis_queue, app
+from services.ai_analyzer import warmup
 import os
 
 if __name__ == '__main__':
+    # Load the model and prime it before the first request comes in
+    warmup()
+    # Complaints left queued by the previous run
+    analysis_queue.resume()
     # Disable debug and reloader for Windows compatibility
     # You can manually restart the server when code changes
     app.run(
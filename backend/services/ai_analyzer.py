@@ -1,63 +1,147 @@
 import logging
-from functools import lru_cache
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Sequence
 
-import joblib
+from services.complaint_model import CHUNK_SIZE, predict, to_analysis
+from services.inference_cache import InferenceCache
+from services.inference_pool import InferencePool
+from services.model_registry import ModelRegistry
+from utils.batching import Batcher
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 MODELS_DIR = PROJECT_ROOT / "sbackend" / "camplaint-analyzer" / "models"
+# Versioned models; while it has no manifest the model in MODELS_DIR is served
+MODEL_REGISTRY_DIR = Path(os.getenv('MODEL_REGISTRY_DIR') or MODELS_DIR / "registry")
 
 
-def _load_model(model_name: str):
-    model_path = MODELS_DIR / f"{model_name}_model.pkl"
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"Model file '{model_path}' not found. "
-            "Ensure sbackend models are trained and available."
-        )
-    logging.info("Loading %s model from %s", model_name, model_path)
-    return joblib.load(model_path)
+# Scored once at warmup so the first real complaint does not pay for
+# first-call work in scikit-learn and numpy
+WARMUP_TEXT = "The wifi in the hostel library is not working since yesterday."
+
+_ready = threading.Event()
+_warmup: Dict[str, Any] = {'state': 'pending'}
 
 
-@lru_cache(maxsize=1)
-def _load_models() -> Dict[str, Any]:
+def _load_model() -> Dict[str, Any]:
     if not MODELS_DIR.exists():
         raise FileNotFoundError(
             f"Models directory '{MODELS_DIR}' not found. "
             "Make sure sbackend is present with trained models."
         )
+    return _registry.get()
+
+
+def _prime(model: Dict[str, Any]) -> None:
+    # First-call work (here and in the inference processes) done before the
+    # model serves requests: at warmup, and before a new version is swapped in
+    predict(model, [WARMUP_TEXT])
+    if _pool is not None:
+        _pool.warmup(WARMUP_TEXT, model['path'])
+
+
+def preload() -> None:
+    """Load the model now, e.g. in the gunicorn master so forked workers share it."""
+    _load_model()
+
+
+def warmup() -> bool:
+    """Load the model and score a dummy complaint; readiness() reports the outcome.
+
+    Run once per worker at boot (gunicorn's post_worker_init, run.py). The
+    dummy prediction bypasses the analysis cache. Also starts the thread that
+    swaps in newly activated model versions (MODEL_RELOAD_SECONDS).
+    """
+    started = time.perf_counter()
+    _warmup.update(state='warming', error=None)
+    try:
+        _prime(_load_model())
+    except Exception as e:
+        logging.exception("Analyzer warmup failed")
+        _warmup.update(state='failed', error=str(e))
+        return False
+    _warmup.update(state='ready', seconds=round(time.perf_counter() - started, 3))
+    _ready.set()
+    _registry.watch()
+    return True
 
-    return {
-        "category": _load_model("category"),
-        "priority": _load_model("priority"),
-        "type": _load_model("type"),
-        "department": _load_model("department"),
-    }
+
+def readiness() -> Dict[str, Any]:
+    """Whether warmup has completed in this worker, with its timing or error."""
+    status = dict(_warmup, ready=_ready.is_set(), pid=os.getpid())
+    if _registry.current is not None:
+        status['modelVersion'] = _registry.current.get('version')
+    return status
 
 
 def analyze_text(text: str) -> Dict[str, Any]:
-    """Run AI analysis against the shared sbackend models."""
-    if not text or not text.strip():
-        raise ValueError("Complaint text cannot be empty.")
+    """Run AI analysis against the shared sbackend models.
+
+    Concurrent callers are scored together: the text joins the batch the
+    analyzer thread gathers within ANALYZE_BATCH_MS (up to ANALYZE_BATCH_MAX
+    texts), and the call returns once that batch has been predicted.
+    """
+    _validate([text])
+    return _batcher.submit(text).result()
+
+
+def analyze_texts(texts: Sequence[str], chunk_size: int = CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Analyze many complaints at once; results are in input order.
+
+    The texts go through the model `chunk_size` at a time instead of one
+    call per text, which is much cheaper for imports and re-scoring. With
+    ANALYZE_PROCESSES, the texts the cache does not hold are split across
+    that many inference processes. Each result records the `modelVersion`
+    that produced it; one call uses one version even if another is swapped
+    in meanwhile.
+    """
+    _validate(texts)
+    model = _load_model()
+    score = None
+    if _pool is not None:
+        score = lambda batch: _pool.predict(batch, model['path'])
+    predictions = predict(model, list(texts), chunk_size, cache=_cache, score=score)
+    return [dict(to_analysis(prediction), modelVersion=model.get('version')) for prediction in predictions]
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the analysis cache in this worker."""
+    return _cache.stats() if _cache is not None else {'enabled': False}
+
+
+def _validate(texts: Sequence[str]) -> None:
+    for i, text in enumerate(texts):
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Complaint text cannot be empty." if len(texts) == 1
+                             else f"Complaint text at index {i} cannot be empty.")
 
-    models = _load_models()
-    payload = [text]
 
-    category = models["category"].predict(payload)[0]
-    priority = models["priority"].predict(payload)[0]
-    compl_type = models["type"].predict(payload)[0]
-    department = models["department"].predict(payload)[0]
+# Predictions by model version and normalized text; ANALYSIS_CACHE_FILE
+# persists them and shares them between workers
+_cache_size = int(os.getenv('ANALYSIS_CACHE_SIZE', '10000'))
+_cache = InferenceCache(_cache_size, os.getenv('ANALYSIS_CACHE_FILE') or None) if _cache_size > 0 else None
 
-    proba = models["category"].predict_proba(payload)[0]
-    confidence = round(float(proba.max()) * 100, 2)
+# ANALYZE_PROCESSES > 0: score in that many processes, so tokenization of
+# concurrent batches is not serialized on this process's GIL
+_processes = int(os.getenv('ANALYZE_PROCESSES', '0'))
+_pool = InferencePool(MODELS_DIR, _processes) if _processes > 0 else None
 
-    return {
-        "category": category,
-        "priority": priority,
-        "type": compl_type,
-        "assignedDepartment": department,
-        "aiConfidence": confidence,
-    }
+# The model being served, replaced in the background when another version is
+# activated in the registry (checked every MODEL_RELOAD_SECONDS, 0 disables)
+_registry = ModelRegistry(
+    MODELS_DIR,
+    MODEL_REGISTRY_DIR,
+    reload_interval=float(os.getenv('MODEL_RELOAD_SECONDS', '30')),
+    on_load=_prime,
+)
 
+# Texts from concurrent analyze_text calls are predicted as one batch
+_batcher = Batcher(
+    analyze_texts,
+    max_wait=float(os.getenv('ANALYZE_BATCH_MS', '0')) / 1000,
+    max_items=int(os.getenv('ANALYZE_BATCH_MAX', '64')),
+    name='analyzer',
+)
@@ -0,0 +1,186 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from storage import ComplaintStore, record_id
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process resumes
+    fcntl = None
+
+QUEUED = 'queued'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+def analysis_status(complaint: Dict[str, Any]) -> str:
+    """queued, completed or failed; complaints analyzed on submission count as completed."""
+    return (complaint.get('aiAnalysis') or {}).get('status', COMPLETED)
+
+
+def analysis_fields(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """The changes that record an analyze_texts result on a stored complaint."""
+    return {
+        'category': analysis.get('category', 'General'),
+        'priority': analysis.get('priority', 'Medium'),
+        'department': analysis.get('assignedDepartment', ''),
+        'aiAnalysis': {
+            'status': COMPLETED,
+            'type': analysis.get('type', 'General'),
+            'confidence': analysis.get('aiConfidence', 0),
+            'modelVersion': analysis.get('modelVersion'),
+            'analyzedAt': datetime.utcnow().isoformat(),
+        },
+    }
+
+
+class AnalysisQueue:
+    """Analyze stored complaints in the background and patch their records.
+
+    `submit` queues a complaint that was stored with aiAnalysis.status
+    'queued'. `workers` background threads each take whatever is queued (up
+    to `max_batch` complaints), score the texts with one `analyze(texts)`
+    call and write the results with one `store.update_many`. A failed
+    analysis is recorded as status 'failed' with the error. `wait` returns a
+    complaint once its analysis is done, so clients can long-poll for it.
+
+    Results are only written to complaints that are still queued, checked
+    under the store's write lock: a second analysis of the same complaint
+    never overwrites the first one, or edits made since.
+
+    The queue lives in the process: complaints still queued when a worker
+    exits are picked up again by `resume` in the next one.
+    """
+
+    def __init__(self, store: ComplaintStore, analyze: Callable[[List[str]], Sequence[Dict[str, Any]]],
+                 workers: int = 1, max_batch: int = 64, poll_interval: float = 0.25):
+        self.store = store
+        self.analyze = analyze
+        self.workers = workers
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self._queue: 'queue.Queue[Tuple[str, str]]' = queue.Queue()
+        self._done: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._resume_lock = None
+        self._resume_pid: Optional[int] = None
+
+    def _ensure_threads(self) -> None:
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._done = {}
+                self._threads = []
+                self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'analysis-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, complaint_id: str, text: str) -> None:
+        """Queue a stored complaint for analysis of `text`."""
+        self._ensure_threads()
+        with self._lock:
+            self._done.setdefault(str(complaint_id), threading.Event())
+        self._queue.put((str(complaint_id), text))
+
+    def resume(self, lock_path: Optional[Path] = None) -> int:
+        """Queue every stored complaint still waiting for analysis; returns how many.
+
+        With `lock_path`, only one process at a time resumes: the first to
+        lock the file keeps the lock until it exits, and the others skip.
+        The process that replaces it then takes the lock and resumes.
+        """
+        if lock_path is not None and not self._claim(Path(lock_path)):
+            return 0
+        queued = [c for c in self.store.iter_records() if analysis_status(c) == QUEUED]
+        for complaint in queued:
+            self.submit(record_id(complaint), f"{complaint.get('title')}. {complaint.get('description')}")
+        if queued:
+            logging.info("Resumed analysis of %d queued complaints", len(queued))
+        return len(queued)
+
+    def _claim(self, lock_path: Path) -> bool:
+        if fcntl is None or self._resume_pid == os.getpid():
+            return True
+        lock_file = open(lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held open (and locked) for the life of the process; the OS releases it on exit
+        self._resume_lock, self._resume_pid = lock_file, os.getpid()
+        return True
+
+    def pending(self) -> int:
+        """Complaints queued or being analyzed in this process."""
+        with self._lock:
+            return len(self._done)
+
+    def wait(self, complaint_id: str, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """The stored complaint once it is no longer queued, or as it is after `timeout` seconds.
+
+        Complaints queued in this process wake the caller as soon as they are
+        written; others (queued by another worker) are re-read every
+        `poll_interval` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            complaint = self.store.get(complaint_id)
+            remaining = deadline - time.monotonic()
+            if complaint is None or analysis_status(complaint) != QUEUED or remaining <= 0:
+                return complaint
+            with self._lock:
+                event = self._done.get(str(complaint_id))
+            if event is not None:
+                event.wait(remaining)
+            else:
+                time.sleep(min(self.poll_interval, remaining))
+
+    def _collect(self) -> List[Tuple[str, str]]:
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = dict(self._collect())
+            try:
+                self._process(batch)
+            except Exception:
+                # Left queued in the store: the next resume() retries them
+                logging.exception("Storing the analysis of %d complaints failed", len(batch))
+            finally:
+                with self._lock:
+                    events = [self._done.pop(complaint_id, None) for complaint_id in batch]
+                for event in events:
+                    if event is not None:
+                        event.set()
+
+    def _process(self, batch: Dict[str, str]) -> None:
+        try:
+            analyses = self.analyze(list(batch.values()))
+            changes = {complaint_id: analysis_fields(analysis) for complaint_id, analysis in zip(batch, analyses)}
+        except Exception as e:
+            logging.exception("Analysis of %d queued complaints failed", len(batch))
+            failed = {'status': FAILED, 'error': str(e), 'analyzedAt': datetime.utcnow().isoformat()}
+            changes = {complaint_id: {'aiAnalysis': failed} for complaint_id in batch}
+        # Compare-and-set: skip complaints another worker has analyzed (or that were edited) meanwhile
+        self.store.update_many(changes, where=lambda complaint: analysis_status(complaint) == QUEUED)
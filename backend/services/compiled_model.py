@@ -0,0 +1,342 @@
+"""NumPy-only runtime for the TF-IDF + MultinomialNB complaint model.
+
+At inference the model is a sparse TF-IDF vector times each head's class
+log-probability matrix, plus the class log priors. `export` writes exactly
+those arrays (.npy, memory-mapped on load) and the vectorizer's settings and
+vocabulary (model.json) to a directory; `CompiledModel` scores texts from
+them without importing scikit-learn or scipy, and without the per-call
+validation that dominates sklearn's latency for a single short text.
+
+Models trained with `train.py --featurizer hashing` have no vocabulary: a
+feature's column is its MurmurHash3 modulo n_features, as in sklearn's
+HashingVectorizer. Only the columns seen in training are stored, plus one
+row shared by all unseen ones, and a buckets.npy maps each hash bucket to
+its row, so the artifact is bounded by n_features whatever the vocabulary.
+
+`export(..., dtype='float32')` (or 'float16') stores the idf and weights at
+reduced precision: half (a quarter) of the memory and load time. Scoring
+still accumulates in float64, and `agreement` measures what the rounding
+changes; `main` and train.py report it.
+
+    python -m services.compiled_model [models_dir] [--dtype float32]
+
+compiles the pickles in `models_dir` (default: the sbackend models) and checks
+that the compiled scorer reproduces their predictions.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT = 1
+META_FILE = 'model.json'
+ARRAYS = ('idf', 'weights', 'priors')
+# Hashed models also have hash bucket -> row of idf/weights
+HASHED_ARRAYS = ARRAYS + ('buckets',)
+
+# Vectorizer settings the runtime implements (besides the ones in model.json)
+SUPPORTED = {'analyzer': 'word', 'tokenizer': None, 'preprocessor': None, 'strip_accents': None, 'binary': False}
+HASHING_SUPPORTED = dict(SUPPORTED, alternate_sign=False, norm=None)
+
+# Precisions the idf and weights can be stored at (the priors stay float64)
+DTYPES = ('float64', 'float32', 'float16')
+
+# Distinct features whose hash bucket each process remembers
+BUCKET_CACHE_SIZE = 1 << 16
+
+# head -> (label, probability), as in services.complaint_model
+Prediction = Dict[str, Tuple[str, float]]
+
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed MurmurHash3 (x86, 32-bit), as sklearn.utils.murmurhash3_32 computes it."""
+    c1, c2 = 0xcc9e2d51, 0x1b873593
+    h = seed & 0xffffffff
+    end = len(data) & ~3
+    for (k,) in struct.iter_unpack('<I', data[:end]):
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        h ^= (k * c2) & 0xffffffff
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+    tail = data[end:]
+    if tail:
+        k = int.from_bytes(tail, 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        h ^= (k * c2) & 0xffffffff
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+def _check(params: Dict[str, Any], supported: Dict[str, Any]) -> None:
+    unsupported = {name: params[name] for name, value in supported.items() if params[name] != value}
+    if params.get('norm') not in ('l1', 'l2', None):
+        unsupported['norm'] = params['norm']
+    if unsupported:
+        raise ValueError(f"Cannot compile a vectorizer with {unsupported}")
+
+
+def export(model: Dict[str, Any], directory: Path, dtype: str = 'float64') -> None:
+    """Write the arrays and settings of a {'vectorizer', 'heads'} model to `directory`.
+
+    The vectorizer is a TfidfVectorizer, or a Pipeline of a HashingVectorizer
+    (alternate_sign=False, norm=None) and a TfidfTransformer. `dtype` is the
+    precision of the stored idf and weights.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}, not {dtype!r}")
+    vectorizer = model['vectorizer']
+    if hasattr(vectorizer, 'vocabulary_'):
+        featurizer = tfidf = vectorizer
+        _check(vectorizer.get_params(), SUPPORTED)
+    else:
+        featurizer, tfidf = vectorizer.steps[0][1], vectorizer.steps[-1][1]
+        _check(featurizer.get_params(), HASHING_SUPPORTED)
+        _check(tfidf.get_params(), {})
+    params = dict(featurizer.get_params(), **{name: getattr(tfidf, name) for name in ('norm', 'use_idf', 'sublinear_tf')})
+
+    heads, weights, priors, start = [], [], [], 0
+    for name, clf in model['heads'].items():
+        heads.append({'name': name, 'classes': [str(c) for c in clf.classes_],
+                      'start': start, 'end': start + len(clf.classes_)})
+        weights.append(np.asarray(clf.feature_log_prob_, dtype=np.float64).T)
+        priors.append(np.asarray(clf.class_log_prior_, dtype=np.float64))
+        start += len(clf.classes_)
+    weights = np.hstack(weights)
+    n_features = weights.shape[0]
+    idf = np.asarray(tfidf.idf_ if params['use_idf'] else np.ones(n_features), dtype=np.float64)
+
+    meta = {
+        'format': FORMAT,
+        'lowercase': params['lowercase'],
+        'token_pattern': params['token_pattern'],
+        'stop_words': sorted(featurizer.get_stop_words() or ()),
+        'ngram_range': list(params['ngram_range']),
+        'sublinear_tf': params['sublinear_tf'],
+        'norm': params['norm'],
+        'dtype': dtype,
+        'heads': heads,
+    }
+    # All heads side by side: one gather of a text's rows scores every head
+    arrays = {'priors': np.concatenate(priors)}
+    if featurizer is tfidf:
+        meta.update(featurizer='vocabulary',
+                    vocabulary=sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get))
+        arrays.update(idf=idf.astype(dtype), weights=np.ascontiguousarray(weights, dtype=dtype))
+    else:
+        # Columns no training text hashed to all hold the same (smoothed) values,
+        # so they share the last row
+        seen = np.flatnonzero(sum(np.asarray(clf.feature_count_).sum(axis=0) for clf in model['heads'].values()))
+        unseen = np.setdiff1d(np.arange(n_features), seen)[:1]
+        rows = np.concatenate([seen, unseen])
+        buckets = np.full(n_features, len(seen), dtype=np.int32)
+        buckets[seen] = np.arange(len(seen), dtype=np.int32)
+        meta.update(featurizer='hashing', n_features=n_features)
+        arrays.update(idf=idf[rows].astype(dtype), weights=np.ascontiguousarray(weights[rows], dtype=dtype),
+                      buckets=buckets)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(directory / f'{name}.npy', array)
+    stale = directory / 'buckets.npy'
+    if 'buckets' not in arrays and stale.exists():
+        stale.unlink()
+    # Written last: a directory without it is not a (complete) compiled model
+    with open(directory / META_FILE, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def files(directory: Path) -> List[Path]:
+    """The files of a compiled model, e.g. to fingerprint it."""
+    directory = Path(directory)
+    arrays = HASHED_ARRAYS if (directory / 'buckets.npy').exists() else ARRAYS
+    return [directory / META_FILE] + [directory / f'{name}.npy' for name in arrays]
+
+
+class CompiledModel:
+    """Scores texts like the exported vectorizer and MultinomialNB heads."""
+
+    def __init__(self, directory: Path, mmap_mode: Optional[str] = 'r'):
+        directory = Path(directory)
+        with open(directory / META_FILE, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT:
+            raise ValueError(f"{directory}: unsupported compiled model format {meta.get('format')}")
+        self.lowercase = meta['lowercase']
+        self.token_pattern = re.compile(meta['token_pattern'])
+        self.stop_words = frozenset(meta['stop_words'])
+        self.ngram_range = tuple(meta['ngram_range'])
+        self.sublinear_tf = meta['sublinear_tf']
+        self.norm = meta['norm']
+        self.dtype = meta.get('dtype', 'float64')
+        self.featurizer = meta.get('featurizer', 'vocabulary')
+        self.vocabulary: Optional[Dict[str, int]] = None
+        self.buckets: Optional[np.ndarray] = None
+        if self.featurizer == 'hashing':
+            n_features = meta['n_features']
+            self.buckets = np.load(directory / 'buckets.npy', mmap_mode=mmap_mode).view(np.ndarray)
+            self._column = lru_cache(maxsize=BUCKET_CACHE_SIZE)(
+                lambda feature: abs(murmurhash3_32(feature.encode('utf-8'))) % n_features)
+        else:
+            self.vocabulary = {term: i for i, term in enumerate(meta['vocabulary'])}
+            self._column = self.vocabulary.get
+        self.heads = [(head['name'], head['classes'], head['start'], head['end']) for head in meta['heads']]
+        self._starts = np.array([head['start'] for head in meta['heads']], dtype=np.intp)
+        self._sizes = np.array([head['end'] - head['start'] for head in meta['heads']], dtype=np.intp)
+        # Plain ndarray views of the maps: same pages, without np.memmap's per-index overhead
+        self.idf, self.weights, self.priors = (
+            np.load(directory / f'{name}.npy', mmap_mode=mmap_mode).view(np.ndarray) for name in ARRAYS
+        )
+
+    @property
+    def classes(self) -> Dict[str, List[str]]:
+        return {name: list(classes) for name, classes, _, _ in self.heads}
+
+    def analyze(self, text: str) -> List[str]:
+        """The features of `text`, as TfidfVectorizer.build_analyzer() makes them."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = [token for token in self.token_pattern.findall(text) if token not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        features = tokens[:] if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            features.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return features
+
+    def _vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of idf/weights and the TF-IDF values of a text's non-zero columns."""
+        counts: Dict[int, int] = {}
+        for column in map(self._column, self.analyze(text)):
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        columns = sorted(counts)
+        values = np.array([counts[c] for c in columns], dtype=np.float64)
+        indices = np.array(columns, dtype=np.intp)
+        if self.buckets is not None:
+            indices = self.buckets[indices].astype(np.intp)
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        values *= self.idf[indices]
+        if self.norm == 'l2':
+            length = math.sqrt(float(values @ values))
+        else:
+            length = float(np.abs(values).sum()) if self.norm == 'l1' else 0.0
+        if length:
+            values /= length
+        return indices, values
+
+    def predict(self, texts: Sequence[str]) -> List[Prediction]:
+        scores = np.empty((len(texts), len(self.priors)))
+        for row, text in enumerate(texts):
+            # The text's non-zero TF-IDF values times those rows of the weights
+            # (float64 values, so reduced-precision weights accumulate in float64)
+            indices, values = self._vector(text)
+            scores[row] = values @ self.weights[indices]
+        scores += self.priors
+
+        # Per head: probability of the best class, exp(top - logsumexp(head)),
+        # computed for all heads at once over their column ranges
+        tops = np.maximum.reduceat(scores, self._starts, axis=1)
+        sums = np.add.reduceat(np.exp(scores - np.repeat(tops, self._sizes, axis=1)), self._starts, axis=1)
+        probabilities = (1 / sums).tolist()
+        best = [scores[:, start:end].argmax(axis=1).tolist() for _, _, start, end in self.heads]
+
+        predictions: List[Prediction] = []
+        for row in range(len(texts)):
+            predictions.append({
+                name: (classes[best[h][row]], probabilities[row][h])
+                for h, (name, classes, _, _) in enumerate(self.heads)
+            })
+        return predictions
+
+
+def agreement(expected: Sequence[Prediction], got: Sequence[Prediction]) -> Dict[str, Dict[str, float]]:
+    """Per head: the share of identical labels and the mean/max probability difference."""
+    report = {}
+    for head in expected[0] if expected else ():
+        same = sum(e[head][0] == g[head][0] for e, g in zip(expected, got))
+        deltas = [abs(e[head][1] - g[head][1]) for e, g in zip(expected, got)]
+        report[head] = {'agreement': same / len(expected), 'meanDelta': sum(deltas) / len(deltas),
+                        'maxDelta': max(deltas)}
+    return report
+
+
+def print_agreement(report: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'head':<12}{'labels same':>14}{'mean |dp|':>12}{'max |dp|':>12}")
+    for head, row in report.items():
+        print(f"{head:<12}{row['agreement']:>14.4%}{row['meanDelta']:>12.2e}{row['maxDelta']:>12.2e}")
+
+
+def _training_words(models_dir: Path) -> List[str]:
+    """Distinct words of the training CSVs next to `models_dir` (train.py's inputs)."""
+    import csv
+
+    words = set()
+    for path in sorted(Path(models_dir).parent.glob('*.csv')):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                words.update((row.get('complaint_text') or '').split())
+    return sorted(words)
+
+
+def main() -> None:
+    import argparse
+
+    from services.ai_analyzer import MODELS_DIR
+    from services.complaint_model import COMPILED_DIR, HEADS, load_model, predict, vocabulary
+
+    parser = argparse.ArgumentParser(description="Compile the complaint model pickles for the NumPy scorer")
+    parser.add_argument('models_dir', nargs='?', type=Path, default=MODELS_DIR)
+    parser.add_argument('--dtype', choices=DTYPES, default='float64',
+                        help="Precision of the stored idf and weights (default: float64)")
+    args = parser.parse_args()
+
+    model = load_model(args.models_dir, compiled=False)
+    # Checked before it replaces the served artifact
+    target = args.models_dir / COMPILED_DIR
+    staging = target.with_name(target.name + '.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    export(model, staging, args.dtype)
+    compiled = CompiledModel(staging)
+
+    # Check on the vocabulary itself (hashed models have none: the words of
+    # the training data instead): every feature alone and in random mixes
+    rng = np.random.RandomState(0)
+    terms = vocabulary(model) or _training_words(args.models_dir)
+    texts = terms + [' '.join(rng.choice(terms, size=rng.randint(1, 30))) for _ in range(2000)]
+    expected = predict(model, texts)
+    got = compiled.predict(texts)
+    # Reduced precision may move probabilities (reported below), never labels
+    tolerance = 1e-9 if args.dtype == 'float64' else math.inf
+    mismatches = sum(
+        g[head][0] != e[head][0] or abs(g[head][1] - e[head][1]) > tolerance
+        for g, e in zip(got, expected) for head in HEADS
+    )
+    print(f"Compiled {target} ({compiled.featurizer}, {args.dtype}): "
+          f"{len(compiled.weights)} feature rows, {sum(len(c) for c in compiled.classes.values())} classes, "
+          f"{mismatches} mismatches on {len(texts)} texts")
+    if args.dtype != 'float64':
+        print_agreement(agreement(expected, got))
+    if mismatches:
+        shutil.rmtree(staging)
+        raise SystemExit(f"Not replacing {target}: the compiled model does not reproduce the pickles")
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(staging, target)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""The complaint classifier: one TF-IDF vectorizer shared by four heads.
+
+sbackend/camplaint-analyzer/train.py saves it as a plain dict,
+
+    {'vectorizer': TfidfVectorizer, 'heads': {head: MultinomialNB}}
+
+so unpickling needs nothing beyond scikit-learn. Model directories trained
+before that hold one Pipeline per head instead; `load_model` merges those
+into the same shape when their vectorizers are identical.
+
+With `train.py --featurizer hashing` the vectorizer is a Pipeline of a
+HashingVectorizer and a TfidfTransformer instead: no vocabulary, a fixed
+number of columns.
+
+train.py also compiles the model for services.compiled_model, a NumPy-only
+scorer that gives the same predictions faster and without scikit-learn;
+`load_model` prefers it when present, as {'scorer', 'heads': {head: classes}}.
+
+Loaded models also carry a 'version', a digest of the files they came from.
+Their numpy arrays (idf weights, per-class log probabilities) are memory
+mapped read-only from the .npy files or the pickles (which joblib writes
+uncompressed), so every process that loads the same file shares one copy in
+the page cache.
+"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+from services import compiled_model
+from services.inference_cache import InferenceCache
+
+HEADS = ('category', 'priority', 'type', 'department')
+MODEL_FILE = 'complaint_model.pkl'
+COMPILED_DIR = 'complaint_model'
+
+# Texts vectorized per sparse-matrix pass; bounds the memory of large batches
+CHUNK_SIZE = 512
+
+# head -> (label, probability)
+Prediction = Dict[str, Tuple[str, float]]
+
+
+def _same_vectorizer(a, b) -> bool:
+    return a.get_params() == b.get_params() and a.vocabulary_ == b.vocabulary_ \
+        and np.array_equal(a.idf_, b.idf_)
+
+
+def combine_pipelines(pipelines: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge per-head ('tfidf', 'clf') Pipelines into a shared-vectorizer model."""
+    vectorizer = pipelines[HEADS[0]].named_steps['tfidf']
+    for head in HEADS[1:]:
+        if not _same_vectorizer(vectorizer, pipelines[head].named_steps['tfidf']):
+            raise ValueError(f"The {head} model was trained with a different vectorizer; retrain with train.py")
+    return {
+        'vectorizer': vectorizer,
+        'heads': {head: pipelines[head].named_steps['clf'] for head in HEADS},
+    }
+
+
+def file_digest(paths: Iterable[Path]) -> str:
+    """Short sha1 of the contents of `paths`, in order: a model version."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def load_model(models_dir: Path, mmap_mode: Optional[str] = 'r', compiled: bool = True) -> Dict[str, Any]:
+    """Load the complaint model from `models_dir`.
+
+    The compiled model is used when present (unless `compiled` is False),
+    then the multi-head pickle, then the per-head pipelines. `mmap_mode` is
+    passed to np.load/joblib.load; None reads the arrays into memory.
+    """
+    models_dir = Path(models_dir)
+    compiled_dir = models_dir / COMPILED_DIR
+    if compiled and (compiled_dir / compiled_model.META_FILE).exists():
+        logging.info("Loading compiled complaint model from %s", compiled_dir)
+        scorer = compiled_model.CompiledModel(compiled_dir, mmap_mode)
+        return {'scorer': scorer, 'heads': scorer.classes, 'version': file_digest(compiled_model.files(compiled_dir))}
+
+    model_path = models_dir / MODEL_FILE
+    if model_path.exists():
+        logging.info("Loading complaint model from %s", model_path)
+        model = joblib.load(model_path, mmap_mode=mmap_mode)
+        model['version'] = file_digest([model_path])
+        return model
+
+    pipelines = {}
+    for head in HEADS:
+        path = models_dir / f"{head}_model.pkl"
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Model file '{path}' not found. "
+                "Ensure sbackend models are trained and available."
+            )
+        logging.info("Loading %s model from %s", head, path)
+        pipelines[head] = joblib.load(path, mmap_mode=mmap_mode)
+    model = combine_pipelines(pipelines)
+    model['version'] = file_digest(models_dir / f"{head}_model.pkl" for head in HEADS)
+    return model
+
+
+def analyzer(model: Dict[str, Any]) -> Callable[[str], List[str]]:
+    """The function that turns a text into the model's features."""
+    if 'scorer' in model:
+        return model['scorer'].analyze
+    vectorizer = model['vectorizer']
+    if hasattr(vectorizer, 'steps'):
+        # Hashing pipeline: the HashingVectorizer makes the features
+        vectorizer = vectorizer.steps[0][1]
+    return vectorizer.build_analyzer()
+
+
+def vocabulary(model: Dict[str, Any]) -> List[str]:
+    """Every feature the model knows; empty for hashed models, which have no vocabulary."""
+    if 'scorer' in model:
+        return list(model['scorer'].vocabulary or ())
+    return list(getattr(model['vectorizer'], 'vocabulary_', ()))
+
+
+def cache_key(model: Dict[str, Any], features: List[str]) -> str:
+    """Content key of a text's prediction: the model version and the text's features.
+
+    `features` is what the vectorizer's analyzer makes of the text (lowercased
+    tokens minus stop words, plus their bigrams), so texts differing only in
+    case, whitespace or punctuation share a key, and the model is guaranteed
+    to give them the same prediction.
+    """
+    key = model.get('version', '') + '\0' + '\x1f'.join(features)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def predict(model: Dict[str, Any], texts: Sequence[str], chunk_size: int = CHUNK_SIZE,
+            cache: Optional[InferenceCache] = None,
+            score: Optional[Callable[[Sequence[str]], List[Prediction]]] = None) -> List[Prediction]:
+    """Label and probability from every head, vectorizing each text once.
+
+    Texts are vectorized and scored `chunk_size` at a time, so one call
+    handles a whole batch with a few sparse-matrix passes. With a `cache`,
+    only texts whose cache_key it does not hold are scored, each distinct key
+    once. `score` replaces the scoring of those texts, e.g. with
+    services.inference_pool (it must give the same predictions as `model`).
+    Predictions come back in input order.
+    """
+    if score is None:
+        score = lambda batch: _predict(model, batch, chunk_size)
+    if cache is None:
+        return score(texts)
+
+    features = analyzer(model)
+    keys = [cache_key(model, features(text)) for text in texts]
+    known = {key: {head: tuple(result) for head, result in value.items()}
+             for key, value in cache.get_many(keys).items()}
+    todo = {key: text for key, text in zip(keys, texts) if key not in known}
+    if todo:
+        scored = dict(zip(todo, score(list(todo.values()))))
+        cache.put_many(scored)
+        known.update(scored)
+    return [dict(known[key]) for key in keys]
+
+
+def _predict(model: Dict[str, Any], texts: Sequence[str], chunk_size: int) -> List[Prediction]:
+    predictions: List[Prediction] = []
+    for offset in range(0, len(texts), chunk_size):
+        predictions.extend(_predict_chunk(model, texts[offset:offset + chunk_size]))
+    return predictions
+
+
+def _predict_chunk(model: Dict[str, Any], texts: Sequence[str]) -> List[Prediction]:
+    if 'scorer' in model:
+        return model['scorer'].predict(texts)
+    features = model['vectorizer'].transform(texts)
+    rows = np.arange(len(texts))
+    predictions: List[Prediction] = [{} for _ in texts]
+    for head, clf in model['heads'].items():
+        # argmax of the log probabilities is what clf.predict() returns
+        log_proba = clf.predict_log_proba(features)
+        best = log_proba.argmax(axis=1)
+        labels = clf.classes_[best]
+        probabilities = np.exp(log_proba[rows, best])
+        for prediction, label, probability in zip(predictions, labels, probabilities):
+            prediction[head] = (str(label), float(probability))
+    return predictions
+
+
+def to_analysis(prediction: Prediction) -> Dict[str, Any]:
+    """The aiAnalysis fields of a complaint from one prediction."""
+    category, confidence = prediction['category']
+    return {
+        'category': category,
+        'priority': prediction['priority'][0],
+        'type': prediction['type'][0],
+        'assignedDepartment': prediction['department'][0],
+        'aiConfidence': round(confidence * 100, 2),
+    }
@@ -0,0 +1,132 @@
+import threading
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.text import complaint_text, tokenize
+from storage import ComplaintStore, record_id
+from storage.base import created_at, sort_key
+
+# Universal hashing modulo a Mersenne prime; a * x stays below 2**63
+_PRIME = (1 << 31) - 1
+
+# Re-read complaints this far behind the newest one seen, so complaints that
+# other workers commit slightly out of createdAt order are not missed
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Unigrams and bigrams of the classifier tokens, like ngram_range=(1, 2)."""
+    tokens = tokenize(text)
+    return frozenset(tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])])
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class DuplicateIndex:
+    """MinHash/LSH index of recent complaints for near-duplicate lookups.
+
+    Each complaint's shingle set gets a `num_perm`-value MinHash signature,
+    split into `bands` bands that are hashed into buckets. Complaints that
+    share a bucket with the query are candidates, and a candidate counts as a
+    duplicate if the exact Jaccard similarity of the shingle sets reaches
+    `threshold`. A lookup therefore touches a handful of buckets, not every
+    stored complaint.
+
+    The index follows the store: complaints written by any worker within the
+    last `window_days` are added on the next lookup (only when the store's
+    version changed) and older ones are evicted.
+    """
+
+    def __init__(self, store: ComplaintStore, threshold: float = 0.8, window_days: float = 30,
+                 num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.store = store
+        self.threshold = threshold
+        self.window = timedelta(days=window_days)
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._entries: Dict[str, Tuple[FrozenSet[str], List[bytes]]] = {}
+        self._order: Deque[Tuple[str, str]] = deque()
+        self._newest: Optional[str] = None
+        self._version: Optional[str] = None
+
+    def _band_keys(self, features: FrozenSet[str]) -> List[bytes]:
+        hashes = np.array([zlib.crc32(f.encode('utf-8')) for f in features], dtype=np.uint64)
+        signature = ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _add(self, complaint: Dict[str, Any]) -> None:
+        key = record_id(complaint)
+        if key in self._entries:
+            return
+        features = shingles(complaint_text(complaint))
+        if not features:
+            return
+        bands = self._band_keys(features)
+        for band, band_key in enumerate(bands):
+            self._buckets.setdefault((band, band_key), set()).add(key)
+        self._entries[key] = (features, bands)
+        self._order.append(sort_key(complaint))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band, band_key in enumerate(entry[1]):
+            bucket = self._buckets.get((band, band_key))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(band, band_key)]
+
+    def _sync(self) -> None:
+        """Add complaints written since the last lookup and evict expired ones."""
+        version = self.store.version()
+        cutoff = (datetime.utcnow() - self.window).isoformat()
+        if version is None or version != self._version:
+            start = cutoff
+            if self._newest:
+                try:
+                    start = max(cutoff, (datetime.fromisoformat(self._newest) - SYNC_OVERLAP).isoformat())
+                except ValueError:
+                    pass  # not an ISO timestamp, re-read the whole window
+            for complaint in self.store.query({}, start=start):
+                self._add(complaint)
+                self._newest = max(self._newest or '', created_at(complaint))
+            self._version = version
+        while self._order and self._order[0][0] < cutoff:
+            self._remove(self._order.popleft()[1])
+
+    def find(self, text: str) -> Optional[Dict[str, Any]]:
+        """The stored complaint `text` near-duplicates, or None."""
+        features = shingles(text)
+        if not features:
+            return None
+        with self._lock:
+            self._sync()
+            candidates: Set[str] = set()
+            for band, band_key in enumerate(self._band_keys(features)):
+                candidates |= self._buckets.get((band, band_key), set())
+            scored = sorted(((jaccard(features, self._entries[key][0]), key) for key in candidates), reverse=True)
+        for similarity, key in scored:
+            if similarity < self.threshold:
+                break
+            original = self.store.get(key)
+            if original is not None:
+                return original
+            with self._lock:
+                self._remove(key)  # deleted since it was indexed
+        return None
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL,
+  used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_analysis_cache_used ON analysis_cache(used);
+"""
+
+# Trim the file back to `max_entries` once per this many stored results
+TRIM_EVERY = 64
+
+
+class InferenceCache:
+    """LRU cache of model results by content key, optionally backed by SQLite.
+
+    Keys are computed by the caller (services.complaint_model.cache_key hashes
+    the model version and the features the model sees), values must be JSON
+    serialisable. The in-process LRU holds up to `max_entries` results. With a
+    `path`, results are also kept in a SQLite file that outlives restarts and
+    is shared by every worker; its least recently used rows are trimmed to
+    the same size. The file is only a cache, so it is written without fsync
+    and any error reading or writing it counts as a miss.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self._memory: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._stored = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._conn()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must not be shared with a forked worker
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached results for whichever of `keys` are present."""
+        keys = list(keys)
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        from_disk = self._read(missing) if missing and self.path is not None else {}
+        with self._lock:
+            for key, value in from_disk.items():
+                self._remember(key, value)
+            for key in keys:
+                if key in from_disk:
+                    self.disk_hits += 1
+                elif key in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        found.update(from_disk)
+        return found
+
+    def put_many(self, results: Dict[str, Any]) -> None:
+        with self._lock:
+            for key, value in results.items():
+                self._remember(key, value)
+        if results and self.path is not None:
+            self._write(results)
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, keys: List[str]) -> Dict[str, Any]:
+        try:
+            conn = self._conn()
+            found = {}
+            for offset in range(0, len(keys), 500):
+                chunk = keys[offset:offset + 500]
+                marks = ','.join('?' * len(chunk))
+                rows = conn.execute(f'SELECT key, value FROM analysis_cache WHERE key IN ({marks})', chunk)
+                found.update((key, json.loads(value)) for key, value in rows)
+                hit = [key for key in chunk if key in found]
+                if hit:
+                    conn.execute(f"UPDATE analysis_cache SET used = ? WHERE key IN ({','.join('?' * len(hit))})",
+                                 [time.time()] + hit)
+            return found
+        except sqlite3.Error as e:
+            logging.warning("Analysis cache %s unreadable: %s", self.path, e)
+            return {}
+
+    def _write(self, results: Dict[str, Any]) -> None:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.executemany('INSERT OR REPLACE INTO analysis_cache (key, value, used) VALUES (?, ?, ?)',
+                             [(key, json.dumps(value), now) for key, value in results.items()])
+            self._stored += len(results)
+            if self._stored >= TRIM_EVERY:
+                self._stored = 0
+                self._trim(conn)
+        except sqlite3.Error as e:
+            logging.warning("Analysis cache %s not updated: %s", self.path, e)
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        row = conn.execute('SELECT used FROM analysis_cache ORDER BY used DESC LIMIT 1 OFFSET ?',
+                           (self.max_entries,)).fetchone()
+        if row is not None:
+            conn.execute('DELETE FROM analysis_cache WHERE used <= ?', (row[0],))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process and the cache sizes."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'hitRate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+                'entries': len(self._memory),
+                'maxEntries': self.max_entries,
+                'pid': os.getpid(),
+            }
+        if self.path is not None:
+            try:
+                stats['diskEntries'] = self._conn().execute('SELECT COUNT(*) FROM analysis_cache').fetchone()[0]
+            except sqlite3.Error:
+                stats['diskEntries'] = None
+        return stats
@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.complaint_model import CHUNK_SIZE, HEADS, Prediction, load_model, predict
+
+# Fewest texts sent to one process: smaller batches cost more in IPC than they save
+MIN_TEXTS_PER_PROCESS = 8
+
+# The model in a pool process and the directory it came from
+_model: Optional[Dict[str, Any]] = None
+_model_dir: Optional[str] = None
+
+
+def _init_process(models_dir: str) -> None:
+    global _model, _model_dir
+    _model, _model_dir = load_model(Path(models_dir)), models_dir
+
+
+def _score(models_dir: str, texts: List[str]) -> List[List[Tuple[str, float]]]:
+    if models_dir != _model_dir:
+        # Another model version is being served now
+        _init_process(models_dir)
+    # Plain lists in HEADS order pickle smaller than one dict per text
+    predictions = predict(_model, texts, CHUNK_SIZE)
+    return [[prediction[head] for head in HEADS] for prediction in predictions]
+
+
+class InferencePool:
+    """Score complaint texts in `processes` worker processes.
+
+    Each process loads the model from `models_dir` once (memory-mapped, so
+    they all share its pages) and scores the texts it is sent, off the
+    caller's GIL. A `predict` for another directory (a newly activated
+    registry version) makes the processes load that one instead. `predict`
+    splits a batch across the processes and returns the predictions in input
+    order, like complaint_model.predict. Only the texts and the (label,
+    probability) pairs cross the process boundary.
+
+    Processes are started with 'spawn', lazily, in the process that first
+    uses the pool: a gunicorn master that preloads the app forks workers
+    without a pool, and each worker starts its own.
+    """
+
+    def __init__(self, models_dir: Path, processes: int, min_texts: int = MIN_TEXTS_PER_PROCESS):
+        self.models_dir = Path(models_dir)
+        self.processes = processes
+        self.min_texts = min_texts
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_process,
+                    initargs=(str(self.models_dir),),
+                )
+                self._pid = os.getpid()
+        return self._executor
+
+    def predict(self, texts: Sequence[str], models_dir: Optional[Path] = None) -> List[Prediction]:
+        models_dir = str(models_dir or self.models_dir)
+        texts = list(texts)
+        if not texts:
+            return []
+        parts = max(1, min(self.processes, len(texts) // self.min_texts))
+        size = -(-len(texts) // parts)
+        pool = self._pool()
+        try:
+            futures = [pool.submit(_score, models_dir, texts[i:i + size]) for i in range(0, len(texts), size)]
+            predictions: List[Prediction] = []
+            for future in futures:
+                predictions.extend(dict(zip(HEADS, row)) for row in future.result())
+            return predictions
+        except BrokenProcessPool:
+            # A process died (e.g. OOM-killed): fail this batch, start a new pool for the next
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+            raise
+
+    def warmup(self, text: str, models_dir: Optional[Path] = None) -> None:
+        """Start every process and have each load the model and score `text`."""
+        models_dir = str(models_dir or self.models_dir)
+        pool = self._pool()
+        # One job per process: each submission that finds no idle process starts one
+        for future in [pool.submit(_score, models_dir, [text]) for _ in range(self.processes)]:
+            future.result()
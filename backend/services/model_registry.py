@@ -0,0 +1,226 @@
+"""Versioned complaint models and the manifest that names the active one.
+
+    models/registry/
+        manifest.json      {"active": "<version>", "versions": {"<version>": {...}}}
+        <version>/         a models directory, as load_model() reads it
+            complaint_model.pkl
+            complaint_model/
+
+`publish` copies a trained models directory in as a new version and, by
+default, makes it the active one; `activate` points the manifest at another
+version, e.g. to roll back. Version directories are complete before the
+manifest names them and the manifest is replaced atomically, so readers see
+the old active version or the new one, never a mix.
+
+`ModelRegistry` serves the active version to the services and swaps in a
+newly activated one from a background thread, without a restart:
+
+    python -m services.model_registry publish ../sbackend/camplaint-analyzer/models
+    python -m services.model_registry activate <version>
+    python -m services.model_registry list
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from services.complaint_model import COMPILED_DIR, MODEL_FILE, file_digest, load_model
+from storage.base import file_lock, fsync_dir
+
+REGISTRY_DIR = 'registry'
+MANIFEST = 'manifest.json'
+
+
+def read_manifest(registry_dir: Path) -> Dict[str, Any]:
+    """The registry's manifest; empty when there is none yet."""
+    try:
+        with open(Path(registry_dir) / MANIFEST, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_manifest(registry_dir: Path, manifest: Dict[str, Any]) -> None:
+    path = Path(registry_dir) / MANIFEST
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def active_version(registry_dir: Path) -> Optional[str]:
+    return read_manifest(registry_dir).get('active')
+
+
+def publish(registry_dir: Path, models_dir: Path, version: Optional[str] = None, activate: bool = True) -> str:
+    """Copy the model in `models_dir` into the registry as a new version; returns its name.
+
+    The version is named after the time and a digest of the model's files
+    unless `version` is given.
+    """
+    registry_dir, models_dir = Path(registry_dir), Path(models_dir)
+    names = [name for name in (MODEL_FILE, COMPILED_DIR) if (models_dir / name).exists()]
+    if not names:
+        raise FileNotFoundError(f"No {MODEL_FILE} or {COMPILED_DIR}/ in '{models_dir}'; train the model first")
+    files = sorted(path for name in names for path in
+                   ((models_dir / name).rglob('*') if (models_dir / name).is_dir() else [models_dir / name])
+                   if path.is_file())
+    version = version or f"{datetime.utcnow():%Y%m%d-%H%M%S}-{file_digest(files)}"
+
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    target = registry_dir / version
+    if target.exists():
+        raise FileExistsError(f"Model version '{version}' is already in {registry_dir}")
+    # Copied under a temporary name and renamed, so a version directory is always complete
+    staging = registry_dir / f'.{version}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    for name in names:
+        if (models_dir / name).is_dir():
+            shutil.copytree(models_dir / name, staging / name)
+        else:
+            shutil.copy2(models_dir / name, staging / name)
+    os.rename(staging, target)
+
+    with file_lock(registry_dir / MANIFEST):
+        manifest = read_manifest(registry_dir)
+        manifest.setdefault('versions', {})[version] = {
+            'createdAt': datetime.utcnow().isoformat(),
+            'source': str(models_dir.resolve()),
+        }
+        if activate:
+            manifest['active'] = version
+        _write_manifest(registry_dir, manifest)
+    return version
+
+
+def activate(registry_dir: Path, version: str) -> None:
+    """Make `version` the one the services serve."""
+    registry_dir = Path(registry_dir)
+    with file_lock(registry_dir / MANIFEST):
+        manifest = read_manifest(registry_dir)
+        if version not in manifest.get('versions', {}) or not (registry_dir / version).is_dir():
+            raise KeyError(f"No model version '{version}' in {registry_dir}")
+        manifest['active'] = version
+        _write_manifest(registry_dir, manifest)
+
+
+class ModelRegistry:
+    """The complaint model to serve: the registry's active version, kept current.
+
+    `get` loads the active version on first use (or the model directly in
+    `models_dir` while the registry has no manifest). `watch` starts a
+    thread that re-reads the manifest every `reload_interval` seconds; when
+    another version has been activated it loads that one, passes it to
+    `on_load` (e.g. to warm it up) and only then replaces the current model.
+    Callers that already hold the old model finish with it. Loaded models
+    carry their 'version' (the registry version name) and 'path'.
+    """
+
+    def __init__(self, models_dir: Path, registry_dir: Optional[Path] = None, reload_interval: float = 30.0,
+                 on_load: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.models_dir = Path(models_dir)
+        self.registry_dir = Path(registry_dir) if registry_dir else self.models_dir / REGISTRY_DIR
+        self.reload_interval = reload_interval
+        self.on_load = on_load
+        self.current: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def get(self) -> Dict[str, Any]:
+        model = self.current
+        if model is not None:
+            return model
+        # Single flight: concurrent first callers wait for one load instead of each loading
+        with self._lock:
+            if self.current is None:
+                self.current = self._load(active_version(self.registry_dir))
+        return self.current
+
+    def _load(self, version: Optional[str]) -> Dict[str, Any]:
+        if version is None:
+            model = load_model(self.models_dir)
+            model['path'] = str(self.models_dir)
+            return model
+        path = self.registry_dir / version
+        logging.info("Loading complaint model version %s", version)
+        model = load_model(path)
+        model.update(version=version, path=str(path))
+        return model
+
+    def reload(self) -> bool:
+        """Swap in the active version if it is not the one being served; True if it was."""
+        version = active_version(self.registry_dir)
+        current = self.current
+        if version is None or (current is not None and current.get('version') == version):
+            return False
+        model = self._load(version)
+        if self.on_load is not None:
+            self.on_load(model)
+        with self._lock:
+            self.current = model
+        logging.info("Now serving complaint model version %s", version)
+        return True
+
+    def watch(self) -> None:
+        """Start the reload thread in this process (once; again after a fork)."""
+        if self.reload_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='model-reload', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.reload()
+            except Exception:
+                # Keep serving the current model; the next check tries again
+                logging.exception("Reloading the complaint model from %s failed", self.registry_dir)
+
+
+def main() -> None:
+    import argparse
+
+    from services.ai_analyzer import MODEL_REGISTRY_DIR, MODELS_DIR
+
+    parser = argparse.ArgumentParser(description="Manage the complaint model registry")
+    parser.add_argument('--registry', type=Path, default=MODEL_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_cmd = commands.add_parser('publish', help="Add a trained models directory as a new version")
+    publish_cmd.add_argument('models_dir', nargs='?', type=Path, default=MODELS_DIR)
+    publish_cmd.add_argument('--version')
+    publish_cmd.add_argument('--no-activate', action='store_true')
+    activate_cmd = commands.add_parser('activate', help="Serve another version")
+    activate_cmd.add_argument('version')
+    commands.add_parser('list', help="Show the versions and which one is active")
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        version = publish(args.registry, args.models_dir, args.version, activate=not args.no_activate)
+        print(f"Published {version}" + ("" if args.no_activate else " (active)"))
+    elif args.command == 'activate':
+        activate(args.registry, args.version)
+        print(f"Activated {args.version}")
+    else:
+        manifest = read_manifest(args.registry)
+        for version, info in sorted(manifest.get('versions', {}).items()):
+            marker = '*' if version == manifest.get('active') else ' '
+            print(f"{marker} {version}  {info.get('createdAt')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Complaint storage backends shared by the backend and sbackend services.
+import os
+from pathlib import Path
+from typing import Optional
+
+from .base import ComplaintStore, record_id
+from .group_commit import GroupCommitWriter
+from .json_store import JsonFileStore
+from .jsonl_log import JsonlLogStore
+from .sqlite_store import SYNCHRONOUS, SqliteStore
+
+STORAGE_BACKENDS = ('json', 'jsonl', 'sqlite')
+
+
+def storage_backend() -> str:
+    """The backend selected by COMPLAINT_STORAGE (default: json)."""
+    backend = os.getenv('COMPLAINT_STORAGE', 'json').lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown COMPLAINT_STORAGE backend '{backend}', expected one of {STORAGE_BACKENDS}")
+    return backend
+
+
+def open_store(json_path: Path, backend: Optional[str] = None,
+               seed: Optional[ComplaintStore] = None) -> ComplaintStore:
+    """Open the complaint store configured by COMPLAINT_STORAGE.
+
+    `json_path` is the legacy JSON array file. The `jsonl` and `sqlite`
+    backends keep their data next to it (`complaints.jsonl`,
+    `complaints.sqlite3`) and are seeded from `seed` - by default the legacy
+    file - the first time they are opened.
+    """
+    backend = backend or storage_backend()
+    json_path = Path(json_path)
+    fsync = os.getenv('COMPLAINT_LOG_FSYNC', 'always').lower()
+
+    if backend == 'json':
+        return JsonFileStore(json_path)
+
+    if seed is None and json_path.exists():
+        seed = JsonFileStore(json_path)
+
+    if backend == 'jsonl':
+        store = JsonlLogStore(
+            json_path.with_suffix('.jsonl'),
+            fsync=fsync,
+            fsync_interval=float(os.getenv('COMPLAINT_LOG_FSYNC_INTERVAL', '1.0')),
+        )
+        if seed is not None and not store.path.exists():
+            store.import_records(seed.iter_records())
+        return store
+
+    if backend == 'sqlite':
+        if fsync not in SYNCHRONOUS:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {tuple(SYNCHRONOUS)}")
+        db_path = json_path.with_suffix('.sqlite3')
+        is_new = not db_path.exists()
+        store = SqliteStore(db_path, synchronous=SYNCHRONOUS[fsync])
+        if seed is not None and is_new:
+            store.import_records(seed.iter_records())
+        return store
+
+    raise ValueError(f"Unknown COMPLAINT_STORAGE backend '{backend}', expected one of {STORAGE_BACKENDS}")
@@ -0,0 +1,217 @@
+import heapq
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+
+# Guards the search indexes that ComplaintStore.search keeps up to date
+_search_lock = threading.Lock()
+
+# Fields whose per-value counts backends keep up to date for analytics
+COUNTED_FIELDS = ('status', 'category', 'priority', 'department', 'domain')
+
+
+def record_id(record: Dict[str, Any]) -> str:
+    """Normalise a complaint id; legacy records use integer ids."""
+    return str(record.get('id'))
+
+
+def created_at(record: Dict[str, Any]) -> str:
+    """Creation timestamp; ComplaintManager records call it `timestamp`."""
+    return record.get('createdAt') or record.get('timestamp') or ''
+
+
+def sort_key(record: Dict[str, Any]) -> Tuple[str, str]:
+    """Stable listing order of complaints: (createdAt, id)."""
+    return created_at(record), record_id(record)
+
+
+def count_values(counts: Dict[str, Dict[Any, int]], record: Dict[str, Any], delta: int = 1) -> None:
+    """Add `delta` to the counts of `record`'s COUNTED_FIELDS values, dropping zeros."""
+    for field in COUNTED_FIELDS:
+        field_counts = counts.setdefault(field, {})
+        value = record.get(field)
+        n = field_counts.get(value, 0) + delta
+        if n:
+            field_counts[value] = n
+        else:
+            field_counts.pop(value, None)
+
+
+def select_records(records: Iterable[Dict[str, Any]], filters: Dict[str, Any], start: Optional[str] = None,
+                   end: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+                   limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Filter `records` as ComplaintStore.query does, by scanning them."""
+    after = tuple(after) if after else None
+    matches = (
+        c for c in records
+        if all(c.get(k) == v for k, v in filters.items())
+        and (not start or created_at(c) >= start)
+        and (not end or created_at(c) < end)
+        and (after is None or sort_key(c) > after)
+    )
+    if limit is None:
+        return sorted(matches, key=sort_key)
+    return heapq.nsmallest(limit, matches, key=sort_key)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive advisory lock on `<path>.lock` across processes."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = f'{path}.lock'
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def fsync_dir(path: Path) -> None:
+    """Make a rename inside `path`'s directory durable (no-op on Windows)."""
+    if os.name == 'nt':
+        return
+    fd = os.open(str(Path(path).parent), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ComplaintStore:
+    """Interface shared by the complaint storage backends."""
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield every stored complaint in insertion order."""
+        raise NotImplementedError
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return every stored complaint as a list."""
+        return list(self.iter_records())
+
+    def get(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        """Return the complaint with the given id, or None."""
+        complaint_id = str(complaint_id)
+        return next((c for c in self.iter_records() if record_id(c) == complaint_id), None)
+
+    def find(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Yield complaints whose fields equal all of `filters`."""
+        return (c for c in self.iter_records() if all(c.get(k) == v for k, v in filters.items()))
+
+    def count(self) -> int:
+        """Number of stored complaints."""
+        return sum(1 for _ in self.iter_records())
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        """Number of complaints per value of `field` (None when missing)."""
+        counts: Dict[Any, int] = {}
+        for complaint in self.iter_records():
+            value = complaint.get(field)
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+    def query(self, filters: Dict[str, Any], start: Optional[str] = None, end: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> Iterable[Dict[str, Any]]:
+        """Complaints whose fields equal all of `filters`, created in [start, end).
+
+        Results come in (createdAt, id) order, start after the key `after`
+        and stop after `limit` complaints (all if None).
+        """
+        if not filters and not start and not end and limit is not None:
+            return self.page(limit, after)
+        return select_records(self.iter_records(), filters, start, end, after, limit)
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[Dict[str, Any], float]]:
+        """Top `limit` complaints for a full-text query with their BM25 scores, best first.
+
+        After a change to the store only the complaints added, changed or
+        removed are re-indexed; finding them compares each record once.
+        """
+        from .search import SearchIndex
+        with _search_lock:
+            version = self.version()
+            built = getattr(self, '_search_index', None)
+            if built is None:
+                built = (None, SearchIndex(), {})
+            if version is None or built[0] != version:
+                _, index, indexed = built
+                records: Dict[Tuple[str, int], Dict[str, Any]] = {}
+                seen: Dict[str, int] = {}
+                for complaint in self.iter_records():
+                    # (id, occurrence): legacy files may repeat an id
+                    complaint_id = record_id(complaint)
+                    key = (complaint_id, seen.get(complaint_id, 0))
+                    seen[complaint_id] = key[1] + 1
+                    records[key] = complaint
+                    old = indexed.get(key)
+                    if old is not complaint and old != complaint:
+                        index.add(key, complaint)
+                for key in indexed.keys() - records.keys():
+                    index.remove(key)
+                built = (version, index, records)
+                self._search_index = built
+            _, index, records = built
+            return [(records[doc], score) for doc, score in index.search(text, limit)]
+
+    def version(self) -> Optional[str]:
+        """Opaque token that changes whenever the stored complaints change.
+
+        None means the backend cannot tell, and responses are not cached.
+        """
+        return None
+
+    def rollup(self, field: str, granularity: str = 'hour', start: Optional[str] = None,
+               end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+        """Complaints per time bucket and value of `field`, for buckets overlapping [start, end).
+
+        `field` is one of COUNTED_FIELDS, `granularity` 'hour' or 'day'; keys
+        are 'YYYY-MM-DDTHH' or 'YYYY-MM-DD'.
+        """
+        from .rollups import query_rollup, rollup_records
+        return query_rollup(rollup_records(self.iter_records()).get(field, {}), granularity, start, end)
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` complaints in (createdAt, id) order, after the key `after`."""
+        # Keeps only `limit` records in memory, not the whole store
+        return select_records(self.iter_records(), {}, after=after, limit=limit)
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new complaint and return it."""
+        raise NotImplementedError
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Persist several new complaints; backends commit them as one batch."""
+        return [self.insert(record) for record in records]
+
+    def update(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge `changes` into a stored complaint; None if it does not exist."""
+        raise NotImplementedError
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Apply `update` for each complaint id in `changes`; backends commit them as one batch.
+
+        With `where`, a complaint is only changed if `where(stored complaint)`
+        holds when it is written (backends check it under their write lock);
+        the others come back as None, like missing ones.
+        """
+        updated: Dict[str, Optional[Dict[str, Any]]] = {}
+        for complaint_id, fields in changes.items():
+            complaint = self.get(complaint_id) if where is not None else None
+            skip = where is not None and (complaint is None or not where(complaint))
+            updated[complaint_id] = None if skip else self.update(complaint_id, fields)
+        return updated
+
+    def delete(self, complaint_id: str) -> bool:
+        """Remove a complaint; False if it does not exist."""
+        raise NotImplementedError
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+
+def file_stamp(st: os.stat_result) -> Tuple[int, int, int]:
+    """Change token of a file; writers replace files, so the inode changes too."""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class ParsedFileCache:
+    """Per-process cache of a parsed JSON file, revalidated with one stat().
+
+    Writes by any process are noticed on the next `get()` because they change
+    the file's inode, mtime or size. The cached value is shared between
+    callers and must be treated as read-only; writers build a new value and
+    pass it to `write()`.
+    """
+
+    def __init__(self, path: Path, default: Callable[[], Any] = list):
+        self.path = Path(path)
+        self.default = default
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._value: Any = None
+
+    def get(self) -> Any:
+        try:
+            stamp = file_stamp(os.stat(self.path))
+        except FileNotFoundError:
+            return self.default()
+        if stamp == self._stamp:
+            return self._value
+
+        with self._lock:
+            try:
+                with open(self.path, 'r') as f:
+                    # Stamp the handle we parse, not the path we stat'ed earlier
+                    stamp = file_stamp(os.fstat(f.fileno()))
+                    if stamp == self._stamp:
+                        return self._value
+                    value = json.load(f)
+            except FileNotFoundError:
+                return self.default()
+            except json.JSONDecodeError:
+                value = self.default()
+            self._stamp, self._value = stamp, value
+            return value
+
+    def write(self, value: Any, indent: Optional[int] = 2) -> None:
+        """Atomically replace the file with `value` and cache it."""
+        # Write to a temp file and rename so readers never see a torn file
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f, indent=indent)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.set(value)
+
+    def set(self, value: Any) -> None:
+        """Record the value just written to the file."""
+        with self._lock:
+            try:
+                self._stamp = file_stamp(os.stat(self.path))
+                self._value = value
+            except FileNotFoundError:
+                self._stamp = self._value = None
+
+    @property
+    def stamp(self) -> Optional[Tuple[int, int, int]]:
+        """Stamp of the cached value (None before the first read)."""
+        return self._stamp
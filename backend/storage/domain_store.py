@@ -0,0 +1,166 @@
+import heapq
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .base import ComplaintStore, file_lock, record_id, sort_key
+from .index import IdIndex
+from .json_store import JsonFileStore
+
+# Domain to filename mapping
+DOMAIN_FILES = {
+    'education': 'education_complaints.json',
+    'healthcare': 'healthcare_complaints.json',
+    'business': 'business_complaints.json',
+    'default': 'other_complaints.json'
+}
+
+INDEX_FILE = 'complaint_index.json'
+
+
+def domain_key(domain: Optional[str]) -> str:
+    """Map a complaint domain to the DOMAIN_FILES key that stores it."""
+    domain = (domain or 'default').lower()
+    return domain if domain in DOMAIN_FILES else 'default'
+
+
+class DomainJsonStore(ComplaintStore):
+    """One JSON array file per domain plus a persisted id -> domain index.
+
+    Lookups by id open only the file the index points at instead of every
+    domain file. Run `rebuild_index()` after editing the files by hand.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.stores = {
+            domain: JsonFileStore(self.data_dir / filename)
+            for domain, filename in DOMAIN_FILES.items()
+        }
+        self.index = IdIndex(self.data_dir / INDEX_FILE)
+        if not self.index.load():
+            self.rebuild_index()
+
+    def rebuild_index(self) -> int:
+        """Rebuild the id -> domain index by scanning every domain file."""
+        with file_lock(self.index.path):
+            self.index.clear()
+            for domain, store in self.stores.items():
+                for complaint in store.iter_records():
+                    self.index.set(record_id(complaint), domain)
+            self.index.save()
+        return len(self.index)
+
+    def _locate(self, complaint_id: str) -> Optional[str]:
+        if complaint_id not in self.index:
+            # Another worker may have written the complaint since we last looked
+            self.index.reload_if_changed()
+        return self.index.get(complaint_id)
+
+    def _set_locations(self, locations: Dict[str, Optional[str]]) -> None:
+        with file_lock(self.index.path):
+            self.index.reload_if_changed()
+            for complaint_id, domain in locations.items():
+                if domain is None:
+                    self.index.remove(complaint_id)
+                else:
+                    self.index.set(complaint_id, domain)
+            self.index.save()
+
+    def iter_records(self, domain: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        if domain:
+            return self.stores[domain_key(domain)].iter_records()
+        return (c for store in self.stores.values() for c in store.iter_records())
+
+    def count(self) -> int:
+        return sum(store.count() for store in self.stores.values())
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        counts: Dict[Any, int] = {}
+        for store in self.stores.values():
+            for value, n in store.count_by(field).items():
+                counts[value] = counts.get(value, 0) + n
+        return counts
+
+    def rollup(self, field: str, granularity: str = 'hour', start: Optional[str] = None,
+               end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+        result: Dict[str, Dict[Any, int]] = {}
+        for store in self.stores.values():
+            for bucket, counts in store.rollup(field, granularity, start, end).items():
+                merged = result.setdefault(bucket, {})
+                for value, n in counts.items():
+                    merged[value] = merged.get(value, 0) + n
+        return result
+
+    def version(self) -> Optional[str]:
+        return '.'.join(store.version() for store in self.stores.values())
+
+    def find(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        # A domain filter selects that domain's file, as ComplaintManager always has
+        domain = filters.pop('domain', None)
+        records = self.iter_records(domain)
+        return (c for c in records if all(c.get(k) == v for k, v in filters.items()))
+
+    def query(self, filters: Dict[str, Any], start: Optional[str] = None, end: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> Iterable[Dict[str, Any]]:
+        # Only the file a domain filter maps to can hold matches
+        stores = [self.stores[domain_key(filters['domain'])]] if 'domain' in filters else self.stores.values()
+        results = [store.query(filters, start, end, after, limit) for store in stores]
+        return islice(heapq.merge(*results, key=sort_key), limit)
+
+    def get(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        domain = self._locate(complaint_id)
+        return self.stores[domain].get(complaint_id) if domain else None
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_domain: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_domain.setdefault(domain_key(record.get('domain')), []).append(record)
+        for domain, domain_records in by_domain.items():
+            self.stores[domain].insert_many(domain_records)
+        self._set_locations({record_id(r): domain_key(r.get('domain')) for r in records})
+        return records
+
+    def update(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        domain = self._locate(complaint_id)
+        if domain is None:
+            return None
+        if 'domain' in changes and domain_key(changes['domain']) != domain:
+            # Move the complaint to the file of its new domain
+            complaint = self.stores[domain].get(complaint_id)
+            if complaint is None:
+                return None
+            complaint = dict(complaint)
+            complaint.update({k: v for k, v in changes.items() if k != 'id'})
+            self.stores[domain].delete(complaint_id)
+            return self.insert(complaint)
+        return self.stores[domain].update(complaint_id, changes)
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        updated: Dict[str, Optional[Dict[str, Any]]] = {}
+        by_domain: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for complaint_id, fields in changes.items():
+            domain = self._locate(complaint_id)
+            if domain is None:
+                updated[complaint_id] = None
+            elif 'domain' in fields and domain_key(fields['domain']) != domain:
+                # Moves rewrite two files; `where` is checked just before, not under one lock
+                complaint = self.stores[domain].get(complaint_id) if where is not None else None
+                skip = where is not None and (complaint is None or not where(complaint))
+                updated[complaint_id] = None if skip else self.update(complaint_id, fields)
+            else:
+                by_domain.setdefault(domain, {})[complaint_id] = fields
+        for domain, domain_changes in by_domain.items():
+            updated.update(self.stores[domain].update_many(domain_changes, where))
+        return {complaint_id: updated[complaint_id] for complaint_id in changes}
+
+    def delete(self, complaint_id: str) -> bool:
+        domain = self._locate(complaint_id)
+        if domain is None or not self.stores[domain].delete(complaint_id):
+            return False
+        self._set_locations({complaint_id: None})
+        return True
@@ -0,0 +1,42 @@
+import logging
+from typing import Any, Dict, List
+
+from utils.batching import Batcher
+
+from .base import ComplaintStore
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits concurrent inserts in batches.
+
+    Submissions that arrive within `window` seconds of each other (or queue up
+    while the previous batch is being written) are persisted with one
+    `insert_many` call, i.e. one write and one fsync or transaction per batch.
+    `insert` returns once the caller's batch is durable.
+    """
+
+    def __init__(self, store: ComplaintStore, window: float = 0.0, max_batch: int = 256):
+        self.store = store
+        self._batcher = Batcher(self._commit, max_wait=window, max_items=max_batch, name='group-commit')
+
+    def _commit(self, records: List[Dict[str, Any]]) -> List[Any]:
+        try:
+            return self.store.insert_many(records)
+        except Exception:
+            if len(records) == 1:
+                raise
+            # Retry one by one so a single bad record only fails its own caller
+            logging.exception("Group commit of %d complaints failed, retrying individually", len(records))
+            results = []
+            for record in records:
+                try:
+                    results.append(self.store.insert(record))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        result = self._batcher.submit(record).result()
+        if isinstance(result, Exception):
+            raise result
+        return result
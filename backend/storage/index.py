@@ -0,0 +1,181 @@
+import bisect
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .cache import file_stamp
+
+
+class IdIndex:
+    """Complaint id -> location map, optionally persisted as a JSON sidecar.
+
+    What a location is depends on the store: a byte range in the JSONL log or
+    the domain file holding the complaint. `meta` carries store-specific state
+    (e.g. how far into the log the index is up to date).
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.locations: Dict[str, Any] = {}
+        self.meta: Dict[str, Any] = {}
+        self._stamp = None
+
+    def __contains__(self, complaint_id: str) -> bool:
+        return str(complaint_id) in self.locations
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.locations)
+
+    def get(self, complaint_id: str) -> Any:
+        return self.locations.get(str(complaint_id))
+
+    def set(self, complaint_id: str, location: Any) -> None:
+        self.locations[str(complaint_id)] = location
+
+    def remove(self, complaint_id: str) -> bool:
+        return self.locations.pop(str(complaint_id), None) is not None
+
+    def clear(self) -> None:
+        self.locations = {}
+        self.meta = {}
+
+    def _file_stamp(self):
+        try:
+            return file_stamp(os.stat(self.path))
+        except (FileNotFoundError, TypeError):
+            return None
+
+    def load(self) -> bool:
+        """Load the sidecar file; False if it is missing or unreadable."""
+        if self.path is None:
+            return False
+        stamp = self._file_stamp()
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return False
+        self.locations = data.get('locations', {})
+        self.meta = data.get('meta', {})
+        self._stamp = stamp
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload from disk if another process rewrote the sidecar file."""
+        if self.path is None or self._file_stamp() == self._stamp:
+            return False
+        return self.load()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'meta': self.meta, 'locations': self.locations}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._stamp = self._file_stamp()
+
+
+class SortedKeys:
+    """Sorted list of (createdAt, id) keys for ordered and range scans."""
+
+    def __init__(self, keys: Iterable[Tuple[str, str]] = ()):
+        self.keys: List[Tuple[str, str]] = sorted(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: Tuple[str, str]) -> None:
+        # Keys mostly arrive in createdAt order, so this is usually an append
+        if not self.keys or key > self.keys[-1]:
+            self.keys.append(key)
+            return
+        i = bisect.bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.keys.insert(i, key)
+
+    def remove(self, key: Tuple[str, str]) -> None:
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def after(self, key: Optional[Tuple[str, str]], limit: int) -> List[Tuple[str, str]]:
+        """Up to `limit` keys strictly greater than `key` (from the start if None)."""
+        start = bisect.bisect_right(self.keys, tuple(key)) if key else 0
+        return self.keys[start:start + limit]
+
+    def span(self, start: Optional[str] = None, end: Optional[str] = None,
+             after: Optional[Tuple[str, str]] = None) -> Tuple[int, int]:
+        """Index range of keys created in [start, end) and greater than `after`."""
+        lo = bisect.bisect_left(self.keys, (start,)) if start else 0
+        if after:
+            lo = max(lo, bisect.bisect_right(self.keys, tuple(after)))
+        hi = bisect.bisect_left(self.keys, (end,)) if end else len(self.keys)
+        return lo, max(lo, hi)
+
+    def select(self, ids: Optional[Set[str]], key_of: Dict[str, Any], start: Optional[str] = None,
+               end: Optional[str] = None, after: Optional[Tuple[str, str]] = None,
+               limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Keys in `span()` whose id is in `ids` (all if None), in order, up to `limit`.
+
+        `key_of` maps an id to something whose item 2 is its createdAt (an
+        index location). Small id sets are sorted directly, large ones are
+        checked against the ordered range, whichever touches fewer keys.
+        """
+        lo, hi = self.span(start, end, after)
+        if lo == hi:
+            return []
+        if ids is None:
+            return self.keys[lo:hi if limit is None else min(hi, lo + limit)]
+        if len(ids) < hi - lo:
+            first, last = self.keys[lo], self.keys[hi - 1]
+            return sorted(k for k in ((key_of[i][2], i) for i in ids) if first <= k <= last)[:limit]
+        keys = []
+        for key in self.keys[lo:hi]:
+            if key[1] in ids:
+                keys.append(key)
+                if limit is not None and len(keys) >= limit:
+                    break
+        return keys
+
+
+class ValueIndex:
+    """field -> value -> ids of the complaints with that value, for equality filters."""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self.ids: Dict[str, Dict[Hashable, Set[str]]] = {field: {} for field in self.fields}
+
+    def add(self, complaint_id: str, values: Sequence[Any]) -> None:
+        for field, value in zip(self.fields, values):
+            self.ids[field].setdefault(value, set()).add(complaint_id)
+
+    def remove(self, complaint_id: str, values: Sequence[Any]) -> None:
+        for field, value in zip(self.fields, values):
+            ids = self.ids[field].get(value)
+            if ids is not None:
+                ids.discard(complaint_id)
+                if not ids:
+                    del self.ids[field][value]
+
+    def match(self, filters: Dict[str, Any]) -> Set[str]:
+        """Ids matching every `field == value` in `filters` (all fields indexed)."""
+        sets = sorted((self.ids[field].get(value, set()) for field, value in filters.items()), key=len)
+        # Intersect starting from the smallest set, so the work is bounded by it
+        result = set(sets[0])
+        for ids in sets[1:]:
+            if not result:
+                break
+            result &= ids
+        return result
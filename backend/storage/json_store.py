@@ -0,0 +1,164 @@
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .base import COUNTED_FIELDS, ComplaintStore, file_lock, record_id, select_records
+from .cache import ParsedFileCache, file_stamp
+from .index import ValueIndex
+from .rollups import Rollups, query_rollup, rollup_records
+
+
+class JsonFileStore(ComplaintStore):
+    """Legacy store: the whole complaint list as one JSON array file.
+
+    Every write rewrites the file, so this is only suitable for small installs.
+    The parsed list is cached per process and re-parsed only when the file's
+    stat changes, so reads between writes do not touch the JSON parser. Cached
+    records are shared: write methods copy them instead of mutating in place.
+    Per-field counts, rollups, the value -> position index used by `query`
+    and the id -> position index used by get/update/delete are computed once
+    per version of the file.
+    """
+
+    def __init__(self, path: Path, indent: int = 2):
+        self.path = Path(path)
+        self.indent = indent
+        self._cache = ParsedFileCache(self.path)
+        self._counts: Tuple[Optional[List[Dict[str, Any]]], Dict[str, Dict[Any, int]]] = (None, {})
+        self._rollups: Tuple[Optional[List[Dict[str, Any]]], Rollups] = (None, {})
+        self._values: Tuple[Optional[List[Dict[str, Any]]], Optional[ValueIndex]] = (None, None)
+        self._positions: Tuple[Optional[List[Dict[str, Any]]], Dict[str, int]] = (None, {})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            with file_lock(self.path):
+                if not self.path.exists():
+                    self._write([])
+
+    def _read(self) -> List[Dict[str, Any]]:
+        """The cached complaint list; callers must not modify it."""
+        return self._cache.get()
+
+    def _write(self, complaints: List[Dict[str, Any]]) -> None:
+        self._cache.write(complaints, indent=self.indent)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._read())
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._read())
+
+    def version(self) -> Optional[str]:
+        # Every write replaces the file, so its stat identifies the contents
+        try:
+            return '-'.join(map(str, file_stamp(os.stat(self.path))))
+        except FileNotFoundError:
+            return '0'
+
+    def _position(self, complaints: List[Dict[str, Any]], complaint_id: str) -> Optional[int]:
+        """Position of the complaint with `complaint_id` in `complaints` (the cached list)."""
+        indexed_for, positions = self._positions
+        if indexed_for is not complaints:
+            positions = {}
+            for position, complaint in enumerate(complaints):
+                # The first one wins where legacy files repeat an id
+                positions.setdefault(record_id(complaint), position)
+            self._positions = (complaints, positions)
+        return positions.get(str(complaint_id))
+
+    def get(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        complaints = self._read()
+        position = self._position(complaints, complaint_id)
+        return dict(complaints[position]) if position is not None else None
+
+    def count(self) -> int:
+        return len(self._read())
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        complaints = self._read()
+        counted, by_field = self._counts
+        if counted is not complaints:
+            # The cached list is replaced, never modified, whenever the file changes
+            by_field = {}
+            self._counts = (complaints, by_field)
+        if field not in by_field:
+            counts: Dict[Any, int] = {}
+            for complaint in complaints:
+                value = complaint.get(field)
+                counts[value] = counts.get(value, 0) + 1
+            by_field[field] = counts
+        return dict(by_field[field])
+
+    def rollup(self, field: str, granularity: str = 'hour', start: Optional[str] = None,
+               end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+        complaints = self._read()
+        counted, rollups = self._rollups
+        if counted is not complaints:
+            rollups = rollup_records(complaints)
+            self._rollups = (complaints, rollups)
+        return query_rollup(rollups.get(field, {}), granularity, start, end)
+
+    def query(self, filters: Dict[str, Any], start: Optional[str] = None, end: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> Iterable[Dict[str, Any]]:
+        indexed = {k: v for k, v in filters.items() if k in COUNTED_FIELDS}
+        if not indexed:
+            return super().query(filters, start, end, after, limit)
+        complaints = self._read()
+        indexed_for, values = self._values
+        if indexed_for is not complaints:
+            # Positions rather than ids: legacy files may repeat an id
+            values = ValueIndex(COUNTED_FIELDS)
+            for position, complaint in enumerate(complaints):
+                values.add(position, [complaint.get(field) for field in COUNTED_FIELDS])
+            self._values = (complaints, values)
+        candidates = (complaints[position] for position in sorted(values.match(indexed)))
+        rest = {k: v for k, v in filters.items() if k not in COUNTED_FIELDS}
+        return select_records(candidates, rest, start, end, after, limit)
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with file_lock(self.path):
+            self._write(self._read() + list(records))
+        return records
+
+    def update(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        complaint_id = str(complaint_id)
+        with file_lock(self.path):
+            complaints = self._read()
+            i = self._position(complaints, complaint_id)
+            if i is None:
+                return None
+            complaints = list(complaints)
+            complaint = dict(complaints[i])
+            complaint.update({k: v for k, v in changes.items() if k != 'id'})
+            complaints[i] = complaint
+            self._write(complaints)
+        return complaint
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        changes = {str(k): v for k, v in changes.items()}
+        updated: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(changes)
+        with file_lock(self.path):
+            cached = self._read()
+            complaints = list(cached)
+            for complaint_id, fields in changes.items():
+                i = self._position(cached, complaint_id)
+                if i is not None and (where is None or where(complaints[i])):
+                    complaint = dict(complaints[i])
+                    complaint.update({k: v for k, v in fields.items() if k != 'id'})
+                    complaints[i] = updated[complaint_id] = complaint
+            if any(updated.values()):
+                self._write(complaints)
+        return updated
+
+    def delete(self, complaint_id: str) -> bool:
+        complaint_id = str(complaint_id)
+        with file_lock(self.path):
+            complaints = self._read()
+            if self._position(complaints, complaint_id) is None:
+                return False
+            # Drops every copy of a repeated legacy id
+            self._write([c for c in complaints if record_id(c) != complaint_id])
+        return True
@@ -0,0 +1,425 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .base import COUNTED_FIELDS, ComplaintStore, count_values, created_at, file_lock, fsync_dir, record_id
+from .index import IdIndex, SortedKeys, ValueIndex
+from .rollups import Rollups, query_rollup, rollup_record
+from .search import SearchIndex
+
+# Marks a log line that removes the complaint with the same id
+TOMBSTONE_KEY = '_deleted'
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+# Persist the id index after replaying this many bytes of log
+CHECKPOINT_BYTES = 1 << 20
+
+# Bumped whenever the layout of the index checkpoint changes
+INDEX_FORMAT = 5
+
+
+def encode_line(entry: Dict[str, Any]) -> bytes:
+    return (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class JsonlLogStore(ComplaintStore):
+    """Append-only store: one JSON line per insert, update or delete.
+
+    Inserts cost O(record) no matter how large the store is. Updates append the
+    full new version of the record and deletes append a tombstone; `compact()`
+    drops superseded lines.
+
+    An id -> (offset, length, createdAt, *COUNTED_FIELDS values) index of the
+    latest line per complaint is kept in memory and caught up with lines appended by other processes on
+    every access, so get/update/delete read exactly one line. The index is
+    checkpointed to `<log>.idx` so a new worker only replays the log tail.
+    A sorted (createdAt, id) key list serves ordered pages and date ranges,
+    value -> id sets serve equality filters, and per-value counts of
+    COUNTED_FIELDS and their hourly rollups, checkpointed with the index,
+    serve `count_by` and `rollup`. The full-text index is built on the first
+    search and then kept current the same way.
+
+    fsync policy:
+      always   - fsync after every append (default, no acknowledged write is lost)
+      interval - fsync at most every `fsync_interval` seconds
+      never    - leave flushing to the OS
+    """
+
+    def __init__(self, path: Path, fsync: str = 'always', fsync_interval: float = 1.0,
+                 index_path: Optional[Path] = None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.path = Path(path)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._last_fsync = 0.0
+        self._lock = threading.RLock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.index = IdIndex(index_path or self.path.with_name(self.path.name + '.idx'))
+        self.created = SortedKeys()
+        self.values = ValueIndex(COUNTED_FIELDS)
+        self.counts: Dict[str, Dict[Any, int]] = {}
+        self.rollups: Rollups = {}
+        self.search_index: Optional[SearchIndex] = None
+        self._index_loaded = False
+        self._checkpointed = 0
+
+    # --- Index maintenance ---
+
+    def _reset_index(self, file_id: Optional[List[int]]) -> None:
+        self.index.clear()
+        self.index.meta = {'file': file_id, 'offset': 0, 'format': INDEX_FORMAT}
+        self.created = SortedKeys()
+        self.values = ValueIndex(COUNTED_FIELDS)
+        self.counts = {}
+        self.rollups = {}
+        self.search_index = None
+        self._checkpointed = 0
+
+    def _load_index(self, file_id: List[int]) -> None:
+        if (self.index.load() and self.index.meta.get('file') == file_id
+                and self.index.meta.get('format') == INDEX_FORMAT):
+            self._checkpointed = self.index.meta.get('offset', 0)
+            self.created = SortedKeys((loc[2], key) for key, loc in self.index.locations.items())
+            self.values = ValueIndex(COUNTED_FIELDS)
+            for key, loc in self.index.locations.items():
+                self.values.add(key, loc[3:])
+            # JSON object keys are strings, so counts are checkpointed as [value, n] pairs
+            self.counts = {field: {value: n for value, n in pairs}
+                           for field, pairs in self.index.meta.get('counts', {}).items()}
+            self.rollups = {field: {bucket: {value: n for value, n in pairs} for bucket, pairs in by_hour.items()}
+                            for field, by_hour in self.index.meta.get('rollups', {}).items()}
+        else:
+            self._reset_index(file_id)
+
+    def _apply(self, entry: Dict[str, Any], offset: int, length: int) -> None:
+        key = record_id(entry)
+        old = self.index.get(key)
+        if old is not None:
+            # The location keeps the indexed fields of the version it points to
+            self.created.remove((old[2], key))
+            self.values.remove(key, old[3:])
+            indexed = dict(zip(COUNTED_FIELDS, old[3:]), createdAt=old[2])
+            count_values(self.counts, indexed, -1)
+            rollup_record(self.rollups, indexed, -1)
+        if self.search_index is not None:
+            if entry.get(TOMBSTONE_KEY):
+                self.search_index.remove(key)
+            else:
+                self.search_index.add(key, entry)
+        if entry.get(TOMBSTONE_KEY):
+            self.index.remove(key)
+        else:
+            values = [entry.get(field) for field in COUNTED_FIELDS]
+            self.index.set(key, [offset, length, created_at(entry)] + values)
+            self.created.add((created_at(entry), key))
+            self.values.add(key, values)
+            count_values(self.counts, entry)
+            rollup_record(self.rollups, entry)
+
+    def _sync(self, f: BinaryIO) -> None:
+        """Catch the index up with the log open as `f`; caller holds `_lock`."""
+        st = os.fstat(f.fileno())
+        file_id = [st.st_dev, st.st_ino]
+
+        if not self._index_loaded:
+            self._index_loaded = True
+            self._load_index(file_id)
+
+        meta = self.index.meta
+        if meta.get('file') != file_id or meta.get('offset', 0) > st.st_size:
+            # The log was compacted or replaced since the index was built
+            self._reset_index(file_id)
+
+        offset = self.index.meta['offset']
+        if offset >= st.st_size:
+            return
+
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # a writer is still appending this line
+            try:
+                self._apply(json.loads(line), offset, len(line))
+            except json.JSONDecodeError:
+                logging.warning("Skipping corrupt line at offset %d in %s", offset, self.path)
+            offset += len(line)
+        self.index.meta['offset'] = offset
+
+        if offset - self._checkpointed >= CHECKPOINT_BYTES:
+            self._save_index()
+
+    def _open_synced(self) -> Optional[BinaryIO]:
+        """Open the log and sync the index with it; caller holds `_lock`."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self._reset_index(None)
+            return None
+        self._sync(f)
+        return f
+
+    def _save_index(self) -> None:
+        self.index.meta['counts'] = {field: list(counts.items()) for field, counts in self.counts.items()}
+        self.index.meta['rollups'] = {field: {bucket: list(counts.items()) for bucket, counts in by_hour.items()}
+                                      for field, by_hour in self.rollups.items()}
+        self.index.save()
+        self._checkpointed = self.index.meta.get('offset', 0)
+
+    def rebuild_index(self) -> int:
+        """Rebuild the id index from a full replay of the log and persist it."""
+        with self._lock:
+            self._index_loaded = True
+            self._reset_index(None)
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            self._save_index()
+            return len(self.index)
+
+    # --- Writing ---
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, file_lock(self.path):
+            yield
+
+    def _write_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """Append entries as one write; the caller holds `_locked()` and has synced."""
+        offset = self.index.meta.get('offset', 0)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > offset:
+            # Drop the partial line left behind by a writer that crashed mid-append
+            os.truncate(self.path, offset)
+
+        lines = [encode_line(entry) for entry in entries]
+        fd = os.open(str(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            data = memoryview(b''.join(lines))
+            while data:
+                data = data[os.write(fd, data):]
+            self._maybe_fsync(fd)
+            if self.index.meta.get('file') is None:
+                st = os.fstat(fd)
+                self.index.meta['file'] = [st.st_dev, st.st_ino]
+        finally:
+            os.close(fd)
+
+        for entry, line in zip(entries, lines):
+            self._apply(entry, offset, len(line))
+            offset += len(line)
+        self.index.meta['offset'] = offset
+
+    def _maybe_fsync(self, fd: int) -> None:
+        if self.fsync == 'never':
+            return
+        now = time.monotonic()
+        if self.fsync == 'always' or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(fd)
+            self._last_fsync = now
+
+    # --- Reading ---
+
+    @staticmethod
+    def _read_at(f: BinaryIO, location: List[int]) -> Dict[str, Any]:
+        f.seek(location[0])
+        return json.loads(f.read(location[1]))
+
+    def _get_locked(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        f = self._open_synced()
+        if f is None:
+            return None
+        with f:
+            location = self.index.get(complaint_id)
+            return self._read_at(f, location) if location else None
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            f = self._open_synced()
+            locations = list(self.index.locations.values())
+        if f is None:
+            return
+        # `f` keeps the snapshot readable even if the log is compacted meanwhile
+        with f:
+            for location in locations:
+                yield self._read_at(f, location)
+
+    def version(self) -> Optional[str]:
+        # The log only grows until compaction replaces it with a new inode
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return '0'
+        return f'{st.st_ino}-{st.st_size}'
+
+    def get(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._get_locked(complaint_id)
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            f = self._open_synced()
+            if f is None:
+                return []
+            locations = [self.index.get(key) for _, key in self.created.after(after, limit)]
+        with f:
+            return [self._read_at(f, location) for location in locations]
+
+    def count(self) -> int:
+        with self._lock:
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            return len(self.index)
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        if field not in COUNTED_FIELDS:
+            return super().count_by(field)
+        with self._lock:
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            return dict(self.counts.get(field, {}))
+
+    def rollup(self, field: str, granularity: str = 'hour', start: Optional[str] = None,
+               end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+        if field not in COUNTED_FIELDS:
+            return super().rollup(field, granularity, start, end)
+        with self._lock:
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            return query_rollup(self.rollups.get(field, {}), granularity, start, end)
+
+    def query(self, filters: Dict[str, Any], start: Optional[str] = None, end: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        indexed = {k: v for k, v in filters.items() if k in COUNTED_FIELDS}
+        rest = {k: v for k, v in filters.items() if k not in COUNTED_FIELDS}
+        with self._lock:
+            f = self._open_synced()
+            if f is None:
+                return
+            # Equality filters intersect id sets; the createdAt order and range come from `created`
+            ids = self.values.match(indexed) if indexed else None
+            keys = self.created.select(ids, self.index.locations, start, end, after, None if rest else limit)
+            locations = [self.index.get(key) for _, key in keys]
+        with f:
+            found = 0
+            for location in locations:
+                record = self._read_at(f, location)
+                if all(record.get(k) == v for k, v in rest.items()):
+                    yield record
+                    found += 1
+                    if found == limit:
+                        return
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            f = self._open_synced()
+            if f is None:
+                return []
+            with f:
+                if self.search_index is None:
+                    self.search_index = SearchIndex()
+                    for key, location in self.index.locations.items():
+                        self.search_index.add(key, self._read_at(f, location))
+                hits = self.search_index.search(text, limit)
+                return [(self._read_at(f, self.index.get(key)), score) for key, score in hits]
+
+    # --- Store interface ---
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # One write and one fsync for the whole batch
+        with self._locked():
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            self._write_entries(records)
+        return records
+
+    def update(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._locked():
+            complaint = self._get_locked(complaint_id)
+            if complaint is None:
+                return None
+            complaint.update({k: v for k, v in changes.items() if k != 'id'})
+            self._write_entries([complaint])
+        return complaint
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        # New versions of every complaint in one append and one fsync
+        updated: Dict[str, Optional[Dict[str, Any]]] = {}
+        with self._locked():
+            for complaint_id, fields in changes.items():
+                complaint = self._get_locked(complaint_id)
+                if complaint is not None and where is not None and not where(complaint):
+                    complaint = None
+                if complaint is not None:
+                    complaint.update({k: v for k, v in fields.items() if k != 'id'})
+                updated[complaint_id] = complaint
+            entries = [complaint for complaint in updated.values() if complaint is not None]
+            if entries:
+                self._write_entries(entries)
+        return updated
+
+    def delete(self, complaint_id: str) -> bool:
+        with self._locked():
+            complaint = self._get_locked(complaint_id)
+            if complaint is None:
+                return False
+            self._write_entries([{'id': complaint['id'], TOMBSTONE_KEY: True}])
+        return True
+
+    # --- Maintenance ---
+
+    def _rewrite(self, records: Iterable[Dict[str, Any]]) -> None:
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            for record in records:
+                f.write(encode_line(record))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(self.path)
+
+    def recount(self) -> Dict[str, Dict[Any, int]]:
+        """Recompute the field counts and rollups from the live records and checkpoint them."""
+        with self._locked():
+            counts: Dict[str, Dict[Any, int]] = {}
+            rollups: Rollups = {}
+            for record in self.iter_records():
+                count_values(counts, record)
+                rollup_record(rollups, record)
+            self.counts, self.rollups = counts, rollups
+            self._save_index()
+            return counts
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> bool:
+        """Seed a new log from existing records; no-op if the log already exists."""
+        with self._locked():
+            if self.path.exists():
+                return False
+            self._rewrite(records)
+        return True
+
+    def compact(self) -> int:
+        """Rewrite the log keeping only live records; returns the number kept."""
+        with self._locked():
+            records = list(self.iter_records())
+            self._rewrite(records)
+            self._reset_index(None)
+            f = self._open_synced()
+            if f is not None:
+                f.close()
+            self._save_index()
+        return len(records)
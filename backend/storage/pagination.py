@@ -0,0 +1,46 @@
+import base64
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .base import ComplaintStore, sort_key
+from .rollups import parse_bound
+
+MAX_PAGE_SIZE = 1000
+
+# Query parameters that filter complaint listings by equality
+FILTER_FIELDS = ('status', 'category', 'priority', 'department', 'domain')
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    """Opaque cursor for the (createdAt, id) key of the last item of a page."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, complaint_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    return str(created_at), str(complaint_id)
+
+
+def parse_filters(args: Mapping[str, str]) -> Tuple[Dict[str, str], Optional[str], Optional[str]]:
+    """Equality filters and the [from, to) createdAt range given in query parameters."""
+    filters = {field: args[field] for field in FILTER_FIELDS if args.get(field)}
+    return filters, parse_bound(args.get('from')), parse_bound(args.get('to'))
+
+
+def paginate(store: ComplaintStore, limit: int, cursor: Optional[str] = None,
+             filters: Optional[Dict[str, Any]] = None, start: Optional[str] = None,
+             end: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of matching complaints ordered by (createdAt, id) and the cursor of the next page."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    after = decode_cursor(cursor) if cursor else None
+    # Fetch one extra item to know whether there is a next page
+    items = list(store.query(filters or {}, start, end, after, limit + 1))
+    next_cursor = encode_cursor(sort_key(items[limit - 1])) if len(items) > limit else None
+    return items[:limit], next_cursor
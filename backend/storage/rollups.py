@@ -0,0 +1,82 @@
+"""Per-hour complaint counts ("rollups") broken down by COUNTED_FIELDS.
+
+Hourly buckets are keyed 'YYYY-MM-DDTHH' so they sort and range-compare as
+strings; daily buckets are the first 10 characters of the hourly ones.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .base import COUNTED_FIELDS, created_at
+
+# Granularity -> length of the bucket key prefix
+GRANULARITIES = {'hour': 13, 'day': 10}
+
+# field -> hour bucket -> value -> count
+Rollups = Dict[str, Dict[str, Dict[Any, int]]]
+
+
+def hour_bucket(timestamp: Any) -> Optional[str]:
+    """Hour bucket of an ISO timestamp, or None if it carries no date."""
+    if not isinstance(timestamp, str) or len(timestamp) < 10:
+        return None
+    hour = timestamp[11:13] if len(timestamp) >= 13 else '00'
+    return f'{timestamp[:10]}T{hour}'
+
+
+def parse_bound(value: Optional[str]) -> Optional[str]:
+    """Normalise a `from`/`to` query value to an ISO timestamp."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid timestamp '{value}'")
+
+
+def rollup_record(rollups: Rollups, record: Dict[str, Any], delta: int = 1) -> None:
+    """Add `delta` to the hourly counts of `record`, dropping zeros."""
+    bucket = hour_bucket(created_at(record))
+    if bucket is None:
+        return
+    for field in COUNTED_FIELDS:
+        by_hour = rollups.setdefault(field, {})
+        counts = by_hour.setdefault(bucket, {})
+        value = record.get(field)
+        n = counts.get(value, 0) + delta
+        if n:
+            counts[value] = n
+        else:
+            counts.pop(value, None)
+            if not counts:
+                del by_hour[bucket]
+
+
+def rollup_records(records: Iterable[Dict[str, Any]]) -> Rollups:
+    rollups: Rollups = {}
+    for record in records:
+        rollup_record(rollups, record)
+    return rollups
+
+
+def bucket_bounds(start: Optional[str], end: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """First and last hour buckets overlapping [start, end); None leaves a side open."""
+    first = hour_bucket(start) if start else None
+    last = None
+    if end:
+        last = hour_bucket((datetime.fromisoformat(end) - timedelta(microseconds=1)).isoformat())
+    return first, last
+
+
+def query_rollup(by_hour: Dict[str, Dict[Any, int]], granularity: str = 'hour',
+                 start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+    """Merge hourly counts into `granularity` buckets within [start, end)."""
+    width = GRANULARITIES[granularity]
+    first, last = bucket_bounds(start, end)
+    result: Dict[str, Dict[Any, int]] = {}
+    for bucket, counts in by_hour.items():
+        if (first is not None and bucket < first) or (last is not None and bucket > last):
+            continue
+        merged = result.setdefault(bucket[:width], {})
+        for value, n in counts.items():
+            merged[value] = merged.get(value, 0) + n
+    return result
@@ -0,0 +1,68 @@
+"""BM25-ranked inverted index over complaint titles and descriptions.
+
+Text is tokenized like the complaint classifiers' TfidfVectorizer
+(services/text.py), so search terms and model features agree.
+"""
+import heapq
+import math
+from typing import Any, Dict, Hashable, List, Tuple
+
+from services.text import complaint_text, tokenize
+
+# BM25 as SQLite's FTS5 bm25() computes it, so every backend ranks alike
+K1 = 1.2
+B = 0.75
+MIN_IDF = 1e-6
+
+
+class SearchIndex:
+    """term -> {doc: term frequency}, updated one complaint at a time."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.docs: Dict[Hashable, Dict[str, int]] = {}
+        self.lengths: Dict[Hashable, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, doc: Hashable, complaint: Dict[str, Any]) -> None:
+        self.remove(doc)
+        terms: Dict[str, int] = {}
+        for token in tokenize(complaint_text(complaint)):
+            terms[token] = terms.get(token, 0) + 1
+        self.docs[doc] = terms
+        self.lengths[doc] = sum(terms.values())
+        self.total_length += self.lengths[doc]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc] = tf
+
+    def remove(self, doc: Hashable) -> None:
+        terms = self.docs.pop(doc, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(doc)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """Top `limit` (doc, score) pairs; only documents containing a query term are scored."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[Hashable, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            # Terms in more than half the documents get a token weight, as in FTS5
+            idf = max(math.log((n - len(posting) + 0.5) / (len(posting) + 0.5)), MIN_IDF)
+            for doc, tf in posting.items():
+                norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * self.lengths[doc] / avg_length))
+                scores[doc] = scores.get(doc, 0.0) + idf * norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
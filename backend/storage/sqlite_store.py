@@ -0,0 +1,560 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.text import complaint_text, tokenize
+
+from .base import COUNTED_FIELDS, ComplaintStore, created_at, record_id
+from .rollups import GRANULARITIES, bucket_bounds
+
+# Tables follow dataconnect/schema/schema.gql (snake_case, like Data Connect
+# generates them). `complaint` carries extra columns for the fields the Python
+# services filter and aggregate on, plus the full record as JSON so reads
+# return exactly what was written. Unlike in schema.gql, status may be NULL:
+# legacy records without one are counted and filtered as None, as in the
+# JSON stores.
+COMPLAINT_COLUMNS = '''(
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    sentiment TEXT NOT NULL DEFAULT '',
+    status TEXT,
+    organization_id TEXT,
+    source TEXT,
+    customer_identifier TEXT,
+    ai_summary TEXT,
+    title TEXT,
+    category TEXT,
+    priority TEXT,
+    department TEXT,
+    domain TEXT,
+    record TEXT NOT NULL
+)'''
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS complaint {COMPLAINT_COLUMNS};
+-- Filter columns lead, (submitted_at, id) follows so filtered listings come out in order
+CREATE INDEX IF NOT EXISTS idx_complaint_status_submitted ON complaint (status, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_complaint_category_submitted ON complaint (category, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_complaint_priority_submitted ON complaint (priority, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_complaint_department_submitted ON complaint (department, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_complaint_domain_submitted ON complaint (domain, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_complaint_submitted_at ON complaint (submitted_at, id);
+
+CREATE TABLE IF NOT EXISTS category (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    organization_id TEXT,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS complaint_category (
+    complaint_id TEXT NOT NULL REFERENCES complaint (id) ON DELETE CASCADE,
+    category_id TEXT NOT NULL REFERENCES category (id),
+    assigned_at TEXT NOT NULL,
+    assigned_by_user_id TEXT,
+    PRIMARY KEY (complaint_id, category_id)
+);
+CREATE INDEX IF NOT EXISTS idx_complaint_category_category ON complaint_category (category_id);
+
+CREATE TABLE IF NOT EXISTS analysis_result (
+    id TEXT PRIMARY KEY,
+    complaint_id TEXT REFERENCES complaint (id) ON DELETE CASCADE,
+    analyzed_at TEXT NOT NULL,
+    key_phrases TEXT NOT NULL DEFAULT '[]',
+    topics TEXT NOT NULL DEFAULT '[]',
+    suggested_action TEXT,
+    confidence_score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_result_complaint ON analysis_result (complaint_id);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta (key, value) VALUES ('generation', 0);
+'''
+
+# Record field -> indexed complaint column
+COLUMNS = {
+    'status': 'status',
+    'category': 'category',
+    'priority': 'priority',
+    'department': 'department',
+    'domain': 'domain',
+    'createdAt': 'submitted_at',
+}
+
+# NULL never matches itself in a primary key, so counters store it as x'00'
+NULL_VALUE = b'\x00'
+
+
+def _count_upsert(row: str, delta: int) -> str:
+    values = ', '.join(f"('{field}', IFNULL({row}.{COLUMNS[field]}, x'00'), {delta})" for field in COUNTED_FIELDS)
+    return (f'INSERT INTO complaint_count (field, value, n) VALUES {values} '
+            f'ON CONFLICT (field, value) DO UPDATE SET n = n + excluded.n;')
+
+
+# Per-value counts of COUNTED_FIELDS, kept current by triggers in the same
+# transaction as the write, so analytics never scan the complaint table
+COUNTER_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS complaint_count (
+    field TEXT NOT NULL,
+    value,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (field, value)
+);
+CREATE TRIGGER IF NOT EXISTS trg_complaint_count_insert AFTER INSERT ON complaint BEGIN
+    {_count_upsert('NEW', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_complaint_count_delete AFTER DELETE ON complaint BEGIN
+    {_count_upsert('OLD', -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_complaint_count_update
+AFTER UPDATE OF {', '.join(COLUMNS[field] for field in COUNTED_FIELDS)} ON complaint BEGIN
+    {_count_upsert('OLD', -1)}
+    {_count_upsert('NEW', 1)}
+END;
+'''
+
+
+def _hour_bucket_sql(column: str) -> str:
+    """SQL twin of rollups.hour_bucket."""
+    return (f"CASE WHEN length({column}) >= 10 THEN substr({column}, 1, 10) || 'T' || "
+            f"CASE WHEN length({column}) >= 13 THEN substr({column}, 12, 2) ELSE '00' END END")
+
+
+def _rollup_upsert(row: str, delta: int) -> str:
+    values = ' UNION ALL '.join(
+        f"SELECT '{field}' AS field, IFNULL({row}.{COLUMNS[field]}, x'00') AS value" for field in COUNTED_FIELDS
+    )
+    return (f'INSERT INTO complaint_rollup (field, bucket, value, n) '
+            f'SELECT field, {_hour_bucket_sql(f"{row}.submitted_at")}, value, {delta} FROM ({values}) '
+            f'WHERE {row}.submitted_at IS NOT NULL AND length({row}.submitted_at) >= 10 '
+            f'ON CONFLICT (field, bucket, value) DO UPDATE SET n = n + excluded.n;')
+
+
+# Hourly counts per value of COUNTED_FIELDS, maintained like complaint_count
+ROLLUP_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS complaint_rollup (
+    field TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    value,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (field, bucket, value)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_complaint_rollup_insert AFTER INSERT ON complaint BEGIN
+    {_rollup_upsert('NEW', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_complaint_rollup_delete AFTER DELETE ON complaint BEGIN
+    {_rollup_upsert('OLD', -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_complaint_rollup_update
+AFTER UPDATE OF submitted_at, {', '.join(COLUMNS[field] for field in COUNTED_FIELDS)} ON complaint BEGIN
+    {_rollup_upsert('OLD', -1)}
+    {_rollup_upsert('NEW', 1)}
+END;
+'''
+
+# Bumped when counters are added, so existing databases are recounted on open
+COUNTERS_VERSION = 2
+
+# Full-text index of title and description, tokenized in Python like the
+# classifiers' TfidfVectorizer and stored as space-separated terms. FTS rowids
+# come from complaint_search because VACUUM may renumber complaint rowids.
+SEARCH_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS complaint_search (
+    doc INTEGER PRIMARY KEY,
+    complaint_id TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS complaint_fts USING fts5(
+    terms, tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+);
+CREATE TRIGGER IF NOT EXISTS trg_complaint_search_delete AFTER DELETE ON complaint BEGIN
+    DELETE FROM complaint_fts WHERE rowid IN (SELECT doc FROM complaint_search WHERE complaint_id = OLD.id);
+    DELETE FROM complaint_search WHERE complaint_id = OLD.id;
+END;
+'''
+
+# Bumped when the search terms change, so existing databases are reindexed on open
+SEARCH_VERSION = 1
+
+# COMPLAINT_LOG_FSYNC policy -> PRAGMA synchronous
+SYNCHRONOUS = {'always': 'FULL', 'interval': 'NORMAL', 'never': 'OFF'}
+
+
+def _analysis(record: Dict[str, Any]) -> Dict[str, Any]:
+    # backend/app.py stores `aiAnalysis`, the sbackend service `analysis`
+    return record.get('aiAnalysis') or record.get('analysis') or {}
+
+
+def complaint_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns of the `complaint` row for a complaint record."""
+    return {
+        'id': record_id(record),
+        'text': record.get('description') or record.get('title') or '',
+        'submitted_at': created_at(record),
+        'status': record.get('status'),
+        'source': record.get('userType'),
+        'customer_identifier': record.get('contactInfo') or record.get('email'),
+        'title': record.get('title'),
+        'category': record.get('category'),
+        'priority': record.get('priority'),
+        'department': record.get('department'),
+        'domain': record.get('domain'),
+        'record': json.dumps(record, separators=(',', ':')),
+    }
+
+
+class SqliteStore(ComplaintStore):
+    """SQLite store (WAL mode) implementing the dataconnect schema.
+
+    Filters on status, category, priority, department, domain and createdAt
+    run as indexed queries; per-value counts of those fields are read from
+    trigger-maintained counters. Full-text search ranks with FTS5's bm25().
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path: Path, synchronous: str = 'FULL'):
+        self.path = Path(path)
+        self.synchronous = synchronous
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate_status(conn)
+        conn.executescript(SCHEMA)
+        conn.executescript(COUNTER_SCHEMA)
+        conn.executescript(ROLLUP_SCHEMA)
+        conn.executescript(SEARCH_SCHEMA)
+        with self._transaction() as conn:
+            # Databases created before the current counters existed are counted once
+            row = conn.execute("SELECT value FROM store_meta WHERE key = 'counts'").fetchone()
+            if row is None or row[0] < COUNTERS_VERSION:
+                self._recount(conn)
+            row = conn.execute("SELECT value FROM store_meta WHERE key = 'search'").fetchone()
+            if row is None or row[0] < SEARCH_VERSION:
+                self._reindex_search(conn)
+
+    def _migrate_status(self, conn: sqlite3.Connection) -> None:
+        """Rebuild a complaint table whose status is NOT NULL, so missing statuses are stored as NULL."""
+        columns = {name: notnull for _, name, _, notnull, _, _ in conn.execute('PRAGMA table_info(complaint)')}
+        if not columns.get('status'):
+            return
+        names = ', '.join(columns)
+        # SQLite cannot drop a constraint in place; dropping the old table must not cascade
+        conn.execute('PRAGMA foreign_keys=OFF')
+        try:
+            with self._transaction() as conn:
+                conn.execute(f'CREATE TABLE complaint_new {COMPLAINT_COLUMNS}')
+                conn.execute(f'INSERT INTO complaint_new ({names}) SELECT {names} FROM complaint')
+                conn.execute("UPDATE complaint_new SET status = json_extract(record, '$.status')")
+                conn.execute('DROP TABLE complaint')
+                conn.execute('ALTER TABLE complaint_new RENAME TO complaint')
+                # Counted as 'pending' until now; the schema scripts recreate indexes and triggers
+                conn.execute("DELETE FROM store_meta WHERE key = 'counts'")
+        finally:
+            conn.execute('PRAGMA foreign_keys=ON')
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must not be shared with a forked worker
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.execute(f'PRAGMA synchronous={self.synchronous}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        # Every write transaction bumps the generation behind version()
+        conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'generation'")
+        conn.execute('COMMIT')
+
+    # --- Row maintenance ---
+
+    def _category_id(self, conn: sqlite3.Connection, name: str) -> str:
+        conn.execute(
+            'INSERT OR IGNORE INTO category (id, name, created_at) VALUES (?, ?, ?)',
+            (str(uuid.uuid4()), name, datetime.utcnow().isoformat()),
+        )
+        return conn.execute('SELECT id FROM category WHERE name = ?', (name,)).fetchone()[0]
+
+    def _write_related(self, conn: sqlite3.Connection, row: Dict[str, Any], record: Dict[str, Any]) -> None:
+        """Refresh the complaint_category, analysis_result and search rows of a complaint."""
+        conn.execute('DELETE FROM complaint_category WHERE complaint_id = ?', (row['id'],))
+        if row['category']:
+            conn.execute(
+                'INSERT INTO complaint_category (complaint_id, category_id, assigned_at) VALUES (?, ?, ?)',
+                (row['id'], self._category_id(conn, row['category']), row['submitted_at']),
+            )
+
+        conn.execute('DELETE FROM analysis_result WHERE complaint_id = ?', (row['id'],))
+        analysis = _analysis(record)
+        if analysis:
+            confidence = analysis.get('confidence', analysis.get('aiConfidence'))
+            conn.execute(
+                'INSERT INTO analysis_result (id, complaint_id, analyzed_at, topics, suggested_action, confidence_score)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    str(uuid.uuid4()),
+                    row['id'],
+                    analysis.get('analyzedAt') or row['submitted_at'],
+                    json.dumps([analysis['type']] if analysis.get('type') else []),
+                    analysis.get('assignedDepartment') or row['department'],
+                    confidence,
+                ),
+            )
+        self._write_search(conn, row['id'], record)
+
+    def _write_search(self, conn: sqlite3.Connection, complaint_id: str, record: Dict[str, Any]) -> None:
+        doc = conn.execute('SELECT doc FROM complaint_search WHERE complaint_id = ?', (complaint_id,)).fetchone()
+        if doc is None:
+            doc = (conn.execute('INSERT INTO complaint_search (complaint_id) VALUES (?)', (complaint_id,)).lastrowid,)
+        else:
+            conn.execute('DELETE FROM complaint_fts WHERE rowid = ?', doc)
+        conn.execute('INSERT INTO complaint_fts (rowid, terms) VALUES (?, ?)',
+                     (doc[0], ' '.join(tokenize(complaint_text(record)))))
+
+    def _insert_row(self, conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+        row = complaint_row(record)
+        conn.execute(
+            f"INSERT INTO complaint ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+            tuple(row.values()),
+        )
+        self._write_related(conn, row, record)
+
+    # --- Store interface ---
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for (record,) in self._conn().execute('SELECT record FROM complaint ORDER BY rowid'):
+            yield json.loads(record)
+
+    def get(self, complaint_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            'SELECT record FROM complaint WHERE id = ?', (str(complaint_id),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        # Keyset pagination on the (submitted_at, id) index
+        if after:
+            cursor = self._conn().execute(
+                'SELECT record FROM complaint WHERE (submitted_at, id) > (?, ?)'
+                ' ORDER BY submitted_at, id LIMIT ?',
+                (after[0], after[1], limit),
+            )
+        else:
+            cursor = self._conn().execute(
+                'SELECT record FROM complaint ORDER BY submitted_at, id LIMIT ?', (limit,)
+            )
+        return [json.loads(record) for (record,) in cursor]
+
+    def query(self, filters: Dict[str, Any], start: Optional[str] = None, end: Optional[str] = None,
+              after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        indexed = {k: v for k, v in filters.items() if k in COLUMNS}
+        rest = {k: v for k, v in filters.items() if k not in COLUMNS}
+        where = [f'{COLUMNS[k]} IS ?' for k in indexed]
+        params: List[Any] = list(indexed.values())
+        if start:
+            where.append('submitted_at >= ?')
+            params.append(start)
+        if end:
+            where.append('submitted_at < ?')
+            params.append(end)
+        if after:
+            where.append('(submitted_at, id) > (?, ?)')
+            params.extend(after)
+        sql = f"SELECT record FROM complaint WHERE {' AND '.join(where) or '1'} ORDER BY submitted_at, id"
+        if limit is not None and not rest:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        found = 0
+        for (record,) in self._conn().execute(sql, params):
+            complaint = json.loads(record)
+            if all(complaint.get(k) == v for k, v in rest.items()):
+                yield complaint
+                found += 1
+                if found == limit:
+                    return
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._transaction() as conn:
+            for record in records:
+                self._insert_row(conn, record)
+        return records
+
+    def update(self, complaint_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            return self._update_row(conn, complaint_id, changes)
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        with self._transaction() as conn:
+            return {complaint_id: self._update_row(conn, complaint_id, fields, where)
+                    for complaint_id, fields in changes.items()}
+
+    def _update_row(self, conn: sqlite3.Connection, complaint_id: str, changes: Dict[str, Any],
+                    where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        row = conn.execute('SELECT record FROM complaint WHERE id = ?', (str(complaint_id),)).fetchone()
+        if row is None:
+            return None
+        complaint = json.loads(row[0])
+        if where is not None and not where(complaint):
+            return None
+        complaint.update({k: v for k, v in changes.items() if k != 'id'})
+
+        new_row = complaint_row(complaint)
+        columns = [c for c in new_row if c != 'id']
+        conn.execute(
+            f"UPDATE complaint SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+            tuple(new_row[c] for c in columns) + (new_row['id'],),
+        )
+        self._write_related(conn, new_row, complaint)
+        return complaint
+
+    def delete(self, complaint_id: str) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute('DELETE FROM complaint WHERE id = ?', (str(complaint_id),))
+        return cursor.rowcount > 0
+
+    def find(self, **filters: Any) -> Iterator[Dict[str, Any]]:
+        indexed = {k: v for k, v in filters.items() if k in COLUMNS}
+        rest = {k: v for k, v in filters.items() if k not in COLUMNS}
+        where = ' AND '.join(f'{COLUMNS[k]} IS ?' for k in indexed) or '1'
+        cursor = self._conn().execute(
+            f'SELECT record FROM complaint WHERE {where} ORDER BY rowid', tuple(indexed.values())
+        )
+        for (record,) in cursor:
+            complaint = json.loads(record)
+            if all(complaint.get(k) == v for k, v in rest.items()):
+                yield complaint
+
+    def count(self) -> int:
+        return self._conn().execute(
+            "SELECT IFNULL(SUM(n), 0) FROM complaint_count WHERE field = 'status'"
+        ).fetchone()[0]
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        if field in COUNTED_FIELDS:
+            cursor = self._conn().execute('SELECT value, n FROM complaint_count WHERE field = ? AND n != 0', (field,))
+            return {None if value == NULL_VALUE else value: n for value, n in cursor}
+        if field not in COLUMNS:
+            return super().count_by(field)
+        column = COLUMNS[field]
+        cursor = self._conn().execute(f'SELECT {column}, COUNT(*) FROM complaint GROUP BY {column}')
+        return dict(cursor.fetchall())
+
+    def version(self) -> Optional[str]:
+        generation = self._conn().execute("SELECT value FROM store_meta WHERE key = 'generation'").fetchone()
+        # The inode tells a recreated database apart from the old one
+        return f'{os.stat(self.path).st_ino}-{generation[0]}'
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[Dict[str, Any], float]]:
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            return []
+        # Any query term may match; FTS5 ranks by bm25() (lower is better) and stops at `limit`
+        cursor = self._conn().execute(
+            'SELECT c.record, -f.rank FROM ('
+            '  SELECT rowid, rank FROM complaint_fts WHERE complaint_fts MATCH ? ORDER BY rank LIMIT ?'
+            ') f JOIN complaint_search s ON s.doc = f.rowid JOIN complaint c ON c.id = s.complaint_id'
+            ' ORDER BY f.rank',
+            (' OR '.join(f'"{term}"' for term in terms), limit),
+        )
+        return [(json.loads(record), score) for record, score in cursor]
+
+    def rollup(self, field: str, granularity: str = 'hour', start: Optional[str] = None,
+               end: Optional[str] = None) -> Dict[str, Dict[Any, int]]:
+        if field not in COUNTED_FIELDS:
+            return super().rollup(field, granularity, start, end)
+        first, last = bucket_bounds(start, end)
+        cursor = self._conn().execute(
+            'SELECT substr(bucket, 1, ?), value, SUM(n) FROM complaint_rollup '
+            'WHERE field = ? AND bucket >= ? AND bucket <= ? AND n != 0 GROUP BY 1, 2',
+            (GRANULARITIES[granularity], field, first or '', last or '\uffff'),
+        )
+        result: Dict[str, Dict[Any, int]] = {}
+        for bucket, value, n in cursor:
+            result.setdefault(bucket, {})[None if value == NULL_VALUE else value] = n
+        return result
+
+    # --- Maintenance ---
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> bool:
+        """Seed an empty database from existing records."""
+        with self._transaction() as conn:
+            if conn.execute('SELECT 1 FROM complaint LIMIT 1').fetchone():
+                return False
+            # Later versions of a duplicated id win, as in the JSONL log
+            for record in {record_id(r): r for r in records}.values():
+                self._insert_row(conn, record)
+        return True
+
+    def _recount(self, conn: sqlite3.Connection) -> Dict[str, Dict[Any, int]]:
+        conn.execute('DELETE FROM complaint_count')
+        for field in COUNTED_FIELDS:
+            conn.execute(
+                f"INSERT INTO complaint_count (field, value, n) "
+                f"SELECT ?, IFNULL({COLUMNS[field]}, x'00'), COUNT(*) FROM complaint GROUP BY 2",
+                (field,),
+            )
+        conn.execute('DELETE FROM complaint_rollup')
+        bucket = _hour_bucket_sql('submitted_at')
+        for field in COUNTED_FIELDS:
+            conn.execute(
+                f"INSERT INTO complaint_rollup (field, bucket, value, n) "
+                f"SELECT ?, {bucket}, IFNULL({COLUMNS[field]}, x'00'), COUNT(*) FROM complaint "
+                f"WHERE length(submitted_at) >= 10 GROUP BY 2, 3",
+                (field,),
+            )
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('counts', ?)", (COUNTERS_VERSION,))
+        counts: Dict[str, Dict[Any, int]] = {}
+        for field, value, n in conn.execute('SELECT field, value, n FROM complaint_count'):
+            counts.setdefault(field, {})[None if value == NULL_VALUE else value] = n
+        return counts
+
+    def _reindex_search(self, conn: sqlite3.Connection) -> None:
+        conn.execute('DELETE FROM complaint_fts')
+        conn.execute('DELETE FROM complaint_search')
+        for complaint_id, record in conn.execute('SELECT id, record FROM complaint').fetchall():
+            self._write_search(conn, complaint_id, json.loads(record))
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('search', ?)", (SEARCH_VERSION,))
+
+    def recount(self) -> Dict[str, Dict[Any, int]]:
+        """Recompute the field counters and rollups from the complaint table."""
+        with self._transaction() as conn:
+            return self._recount(conn)
+
+    def rebuild_index(self) -> int:
+        """Rebuild the SQLite indexes."""
+        self._conn().execute('REINDEX')
+        return self.count()
+
+    def compact(self) -> int:
+        """Reclaim space left by deleted complaints."""
+        self._conn().execute('VACUUM')
+        return self.count()
@@ -0,0 +1,84 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence, Tuple
+
+
+class Batcher:
+    """Collect items submitted from many threads and process them in batches.
+
+    A single background thread takes everything queued (up to `max_items`),
+    optionally waits up to `max_wait` seconds for more, and calls
+    `handler(items)`, which must return one result per item in order (or the
+    whole batch fails). Each caller gets a Future resolved when its batch has
+    been handled. With `max_wait=0` batches form naturally from the items that
+    queue up while the previous batch is being handled, so an idle batcher
+    adds no latency.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], Sequence[Any]], max_wait: float = 0.0,
+                 max_items: int = 256, name: str = 'batcher'):
+        self.handler = handler
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.name = name
+        self._queue: 'queue.Queue[Tuple[Any, Future]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self) -> None:
+        # Threads do not survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the returned Future resolves to its handler result."""
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> List[Tuple[Any, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.handler(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: handler returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logging.exception("%s: batch of %d failed", self.name, len(batch))
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
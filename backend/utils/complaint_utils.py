@@ -1,40 +1,28 @@
-import json
 import os
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
 import uuid
 
+from storage import open_store
+
 # Get the absolute path to the data directory
 DATA_DIR = Path(__file__).parent.parent / 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 
 COMPLAINTS_FILE = DATA_DIR / 'complaints.json'
 
+complaints_store = open_store(COMPLAINTS_FILE)
+
 def load_complaints() -> List[Dict[str, Any]]:
-    """Load all complaints from the JSON file."""
-    if not COMPLAINTS_FILE.exists():
-        return []
-    try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+    """Load all complaints from the configured store."""
+    return complaints_store.all()
 
 def save_complaint(complaint_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Save a new complaint to the JSON file."""
-    complaints = load_complaints()
-    
+    """Save a new complaint to the configured store."""
     # Add metadata
     complaint_data['id'] = str(uuid.uuid4())
     complaint_data['createdAt'] = datetime.utcnow().isoformat()
     complaint_data['status'] = 'pending'
     
-    # Add to the list
-    complaints.append(complaint_data)
-    
-    # Save back to file
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump(complaints, f, indent=2)
-    
-    return complaint_data
+    return complaints_store.insert(complaint_data)
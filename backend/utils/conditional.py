@@ -0,0 +1,35 @@
+import hashlib
+from typing import Any, Optional
+
+from flask import Response, request
+
+
+def store_etag(store: Any, *variant: Any) -> Optional[str]:
+    """Strong ETag for a response built from `store`, or None if it has no version.
+
+    `variant` names everything besides the data that shapes the body (endpoint,
+    query string, format). Read the ETag before the data so a concurrent write
+    can only make it stale, never wrong.
+    """
+    version = store.version()
+    if version is None:
+        return None
+    key = '|'.join([version] + [str(v) for v in variant])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    """Tag a response and make clients revalidate it on every use."""
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """A bodyless 304 if the request's If-None-Match matches `etag`, else None."""
+    if etag is None or not request.if_none_match.contains(etag):
+        return None
+    response = with_etag(Response(status=304), etag)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,65 @@
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+from flask import Response, request, stream_with_context
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+# Flush to the client once this many characters are buffered
+CHUNK_SIZE = 64 * 1024
+
+
+def _encode(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(',', ':'))
+
+
+def json_array_chunks(records: Iterable[Dict[str, Any]], prefix: str = '[',
+                      suffix: str = ']') -> Iterator[str]:
+    """Serialize records as a JSON array wrapped in `prefix`/`suffix`, chunk by chunk."""
+    yield prefix
+    buf, size, separator = [], 0, ''
+    for record in records:
+        piece = separator + _encode(record)
+        separator = ','
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buf)
+            buf, size = [], 0
+    buf.append(suffix)
+    yield ''.join(buf)
+
+
+def ndjson_chunks(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Serialize records as newline-delimited JSON, chunk by chunk."""
+    buf, size = [], 0
+    for record in records:
+        piece = _encode(record) + '\n'
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+def wants_ndjson() -> bool:
+    """True if the request's Accept header prefers NDJSON over JSON."""
+    best = request.accept_mimetypes.best_match(('application/json',) + NDJSON_MIMETYPES)
+    return best in NDJSON_MIMETYPES
+
+
+def stream_records(records: Iterable[Dict[str, Any]], prefix: str = '[', suffix: str = ']') -> Response:
+    """Stream records as they are read from the store instead of building one payload.
+
+    Sends NDJSON (one record per line, no envelope) when the client asks for it
+    via Accept, otherwise a JSON array wrapped in `prefix`/`suffix`.
+    """
+    if wants_ndjson():
+        response = Response(stream_with_context(ndjson_chunks(records)), mimetype='application/x-ndjson')
+    else:
+        response = Response(stream_with_context(json_array_chunks(records, prefix, suffix)),
+                            mimetype='application/json')
+    response.vary.add('Accept')
+    return response
@@ -1,13 +1,25 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
-import joblib
 import os
 import json
 import uuid
 from datetime import datetime, timedelta
 import random
+import sys
 from pathlib import Path
 
+# Complaint storage is shared with the main backend service
+BACKEND_DIR = Path(__file__).resolve().parents[2] / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from services.complaint_model import HEADS, predict, to_analysis
+from services.inference_cache import InferenceCache
+from services.model_registry import ModelRegistry
+from storage import open_store
+from storage.pagination import paginate, parse_filters
+from utils.conditional import not_modified, store_etag, with_etag
+from utils.streaming import stream_records, wants_ndjson
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
@@ -15,30 +27,28 @@ CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
 DATA_DIR = Path(__file__).parent / 'data'
 COMPLAINTS_FILE = DATA_DIR / 'complaints.json'
 DATA_DIR.mkdir(exist_ok=True)
+complaints_store = open_store(COMPLAINTS_FILE)
 
 
 @app.route("/api/analytics", methods=["GET"])
 def get_analytics():
     try:
-        with open(COMPLAINTS_FILE, "r") as f:
-            complaints = json.load(f)
-        total_complaints = len(complaints)
-        resolved_count = sum(1 for c in complaints if c.get("status") == "resolved")
-        pending_count = sum(1 for c in complaints if c.get("status") == "pending")
+        etag = store_etag(complaints_store, "analytics")
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        status_counts = complaints_store.count_by("status")
         category_distribution = {}
-        for c in complaints:
-            category = c.get("category", "Other")
-            if category in category_distribution:
-                category_distribution[category] += 1
-            else:
-                category_distribution[category] = 1
+        for category, count in complaints_store.count_by("category").items():
+            category = category or "Other"
+            category_distribution[category] = category_distribution.get(category, 0) + count
         analytics_data = {
-            "totalComplaints": total_complaints,
-            "resolvedCount": resolved_count,
-            "pendingCount": pending_count,
+            "totalComplaints": sum(status_counts.values()),
+            "resolvedCount": status_counts.get("resolved", 0),
+            "pendingCount": status_counts.get("pending", 0),
             "categoryDistribution": category_distribution,
         }
-        return jsonify(analytics_data), 200
+        return with_etag(jsonify(analytics_data), etag), 200
     except FileNotFoundError:
         return jsonify({"error": "Complaints file not found"}), 500
 
@@ -47,16 +57,21 @@ def get_analytics():
   #  app.run(debug=True, port=5001)
 
 
-# Initialize models as None
-category_model = None
-priority_model = None
-type_model = None
-department_model = None
+# The active model version, swapped in the background when the registry
+# (models/registry) activates another one; see backend/services/model_registry.py
+model_registry = ModelRegistry(
+    Path(__file__).parent / 'models',
+    reload_interval=float(os.environ.get('MODEL_RELOAD_SECONDS', '30')),
+)
+
+# Predictions by model version and normalized text, as in the main backend
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '10000'))
+analysis_cache = InferenceCache(
+    ANALYSIS_CACHE_SIZE, os.environ.get('ANALYSIS_CACHE_FILE') or None
+) if ANALYSIS_CACHE_SIZE > 0 else None
 
 def load_models():
-    """Load all the ML models"""
-    global category_model, priority_model, type_model, department_model
-    
+    """Load the multi-head complaint model"""
     try:
         # Get the directory of the current script
         script_dir = Path(__file__).parent
@@ -72,32 +87,12 @@ def load_models():
             print(f"Models directory not found at: {models_dir}")
             print(f"Current directory contents: {os.listdir(script_dir)}")
             return False
-            
-        # Check if model files exist
-        model_files = {
-            'category': models_dir / 'category_model.pkl',
-            'priority': models_dir / 'priority_model.pkl',
-            'type': models_dir / 'type_model.pkl',
-            'department': models_dir / 'department_model.pkl'
-        }
-        
-        # Verify all model files exist
-        for name, path in model_files.items():
-            if not path.exists():
-                print(f"Model file not found: {path}")
-                print(f"Available files in models directory: {os.listdir(models_dir)}")
-                return False
         
-        # Load all models
+        # One vectorizer shared by the category, priority, type and department heads
         print("Loading models...")
-        category_model = joblib.load(model_files['category'])
-        print("Loaded category model")
-        priority_model = joblib.load(model_files['priority'])
-        print("Loaded priority model")
-        type_model = joblib.load(model_files['type'])
-        print("Loaded type model")
-        department_model = joblib.load(model_files['department'])
-        print("Loaded department model")
+        complaint_model = model_registry.get()
+        print(f"Loaded heads: {', '.join(complaint_model['heads'])} (version {complaint_model.get('version')})")
+        model_registry.watch()
         
         print("All models loaded successfully!")
         return True
@@ -107,6 +102,20 @@ def load_models():
         traceback.print_exc()
         return False
 
+
+def analyze(text):
+    """Labels from every head for one text, vectorized once."""
+    return analyze_batch([text])[0]
+
+
+def analyze_batch(texts):
+    """Labels for many texts in a few sparse-matrix passes, in input order."""
+    # One model version for the whole batch, even if another is swapped in meanwhile
+    complaint_model = model_registry.get()
+    predictions = predict(complaint_model, texts, cache=analysis_cache)
+    return [dict(to_analysis(prediction), modelVersion=complaint_model.get('version'))
+            for prediction in predictions]
+
 # Load models when the application starts
 models_loaded = load_models()
 if not models_loaded:
@@ -117,13 +126,11 @@ if not models_loaded:
 def health_check():
     """Health check endpoint for Render service monitoring."""
     try:
-        # Check if all required models are loaded and callable
-        models_loaded = all([
-            'category_model' in globals() and callable(globals()['category_model'].predict),
-            'priority_model' in globals() and callable(globals()['priority_model'].predict),
-            'type_model' in globals() and callable(globals()['type_model'].predict),
-            'department_model' in globals() and callable(globals()['department_model'].predict)
-        ])
+        # Check that the model and all of its heads are loaded
+        complaint_model = model_registry.current
+        models_loaded = complaint_model is not None and all(
+            head in complaint_model['heads'] for head in HEADS
+        )
         
         if not models_loaded:
             return jsonify({
@@ -135,7 +142,8 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'service': 'complaint-analyzer-ml',
-            'models_loaded': True
+            'models_loaded': True,
+            'modelVersion': complaint_model.get('version')
         })
         
     except Exception as e:
@@ -155,28 +163,15 @@ def health_check():
 
 # --- Directory Setup ---
 MODELS_DIR = 'models'
-DATA_DIR = Path('data')
-COMPLAINTS_FILE = DATA_DIR / 'complaints.json'
-
-# Create data directory if it doesn't exist
-os.makedirs(DATA_DIR, exist_ok=True)
 
-# Initialize empty complaints file if it doesn't exist
-if not COMPLAINTS_FILE.exists():
-    with open(COMPLAINTS_FILE, 'w') as f:
-        json.dump([], f)
+# Largest number of texts one /analyze/batch request may carry
+MAX_BATCH_TEXTS = int(os.environ.get('MAX_BATCH_TEXTS', '5000'))
 
 def save_complaint(complaint_data):
     """Save a new complaint to the JSON file with AI analysis"""
     try:
         # Get AI analysis
-        analysis = {
-            'category': category_model.predict([complaint_data['description']])[0],
-            'priority': priority_model.predict([complaint_data['description']])[0],
-            'type': type_model.predict([complaint_data['description']])[0],
-            'assignedDepartment': department_model.predict([complaint_data['description']])[0],
-            'aiConfidence': round(category_model.predict_proba([complaint_data['description']]).max() * 100, 2)
-        }
+        analysis = analyze(complaint_data['description'])
         
         # Create complaint object
         complaint = {
@@ -187,13 +182,8 @@ def save_complaint(complaint_data):
             'analysis': analysis
         }
         
-        # Save to file
-        with open(COMPLAINTS_FILE, 'r+') as f:
-            complaints = json.load(f)
-            complaints.append(complaint)
-            f.seek(0)
-            json.dump(complaints, f, indent=2)
-            f.truncate()
+        # Save to the complaint store
+        complaints_store.insert(complaint)
             
         return complaint
         
@@ -212,26 +202,13 @@ def analyze_complaint():
         if not complaint_text:
             return jsonify({'error': 'Complaint text cannot be empty'}), 400
 
-        # --- Predictions from all models ---
-        predicted_category = category_model.predict([complaint_text])[0]
-        predicted_priority = priority_model.predict([complaint_text])[0]
-        predicted_type = type_model.predict([complaint_text])[0]
-        
-        # Naye model se department predict karein (YAHAN CODE UPDATE HUA HAI)
-        assigned_department = department_model.predict([complaint_text])[0]
-        
-        # Confidence score (example ke liye abhi sirf category ka use kar rahe hain)
-        category_probas = category_model.predict_proba([complaint_text])
-        confidence = round(category_probas.max() * 100, 2)
+        # --- Predictions from all model heads ---
+        analysis = analyze(complaint_text)
 
         # Frontend ko bhejne ke liye response taiyaar karein
         response = {
             'complaintText': complaint_text,
-            'category': predicted_category,
-            'priority': predicted_priority,
-            'type': predicted_type,
-            'assignedDepartment': assigned_department, # Model se aayi hui prediction
-            'aiConfidence': confidence
+            **analysis
         }
         
         return jsonify(response)
@@ -241,6 +218,40 @@ def analyze_complaint():
         return jsonify({'error': 'An error occurred during analysis.'}), 500
 
 
+@app.route('/analyze/cache', methods=['GET'])
+def analysis_cache_stats():
+    """Hit/miss counters of this worker's analysis cache."""
+    if analysis_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(analysis_cache.stats())
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_complaints_batch():
+    """Analyze a list of complaint texts; results come back in input order."""
+    try:
+        data = request.get_json(force=True)
+        texts = data.get('texts') if isinstance(data, dict) else None
+
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': "'texts' must be a non-empty list"}), 400
+        if len(texts) > MAX_BATCH_TEXTS:
+            return jsonify({'error': f'At most {MAX_BATCH_TEXTS} texts per batch'}), 413
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or not text.strip():
+                return jsonify({'error': f'Complaint text at index {i} cannot be empty'}), 400
+
+        results = [
+            {'complaintText': text, **analysis}
+            for text, analysis in zip(texts, analyze_batch(texts))
+        ]
+        return jsonify({'results': results, 'count': len(results)})
+
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return jsonify({'error': 'An error occurred during analysis.'}), 500
+
+
 @app.route('/api/complaints', methods=['GET', 'POST'])
 def handle_complaints():
     if request.method == 'POST':
@@ -251,38 +262,48 @@ def handle_complaints():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     else:
-        # GET all complaints
+        # GET all complaints, or one page of them when `limit` is given
         try:
-            with open(COMPLAINTS_FILE, 'r') as f:
-                complaints = json.load(f)
-            return jsonify(complaints)
+            # Unchanged store, same query and format: answer 304 without reading
+            etag = store_etag(complaints_store, 'complaints', request.query_string, wants_ndjson())
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
+            filters, start, end = parse_filters(request.args)
+            limit = request.args.get('limit')
+            if limit is None:
+                if filters or start or end:
+                    records = complaints_store.query(filters, start, end)
+                else:
+                    records = complaints_store.iter_records()
+                return with_etag(stream_records(records), etag)
+            complaints, next_cursor = paginate(complaints_store, int(limit), request.args.get('cursor'),
+                                               filters, start, end)
+            return with_etag(jsonify({'data': complaints, 'next': next_cursor}), etag)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
 @app.route('/api/complaints/<complaint_id>', methods=['GET', 'PATCH', 'DELETE'])
 def handle_complaint(complaint_id):
     try:
-        with open(COMPLAINTS_FILE, 'r') as f:
-            complaints = json.load(f)
-        
-        complaint = next((c for c in complaints if c['id'] == complaint_id), None)
-        if not complaint:
-            return jsonify({'error': 'Complaint not found'}), 404
-            
         if request.method == 'GET':
+            complaint = complaints_store.get(complaint_id)
+            if not complaint:
+                return jsonify({'error': 'Complaint not found'}), 404
             return jsonify(complaint)
             
         elif request.method == 'PATCH':
             data = request.get_json()
-            complaint.update(data)
-            with open(COMPLAINTS_FILE, 'w') as f:
-                json.dump(complaints, f, indent=2)
+            complaint = complaints_store.update(complaint_id, data)
+            if not complaint:
+                return jsonify({'error': 'Complaint not found'}), 404
             return jsonify(complaint)
             
         elif request.method == 'DELETE':
-            complaints = [c for c in complaints if c['id'] != complaint_id]
-            with open(COMPLAINTS_FILE, 'w') as f:
-                json.dump(complaints, f, indent=2)
+            if not complaints_store.delete(complaint_id):
+                return jsonify({'error': 'Complaint not found'}), 404
             return '', 204
             
     except Exception as e:
@@ -1,15 +1,18 @@
-import joblib
-import os
+import sys
+from pathlib import Path
 
-# --- Step 1: Load All Trained Models ---
-MODELS_DIR = 'models'
+# The model loader is shared with the main backend service
+BACKEND_DIR = Path(__file__).resolve().parents[2] / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.complaint_model import load_model, predict
+
+# --- Step 1: Load the Trained Model ---
+MODELS_DIR = Path(__file__).parent / 'models'
 
 try:
     print("Loading models...")
-    category_model = joblib.load(os.path.join(MODELS_DIR, 'category_model.pkl'))
-    priority_model = joblib.load(os.path.join(MODELS_DIR, 'priority_model.pkl'))
-    type_model = joblib.load(os.path.join(MODELS_DIR, 'type_model.pkl'))
-    department_model = joblib.load(os.path.join(MODELS_DIR, 'department_model.pkl'))
+    complaint_model = load_model(MODELS_DIR)
     print("Models loaded successfully!")
 except FileNotFoundError:
     print("Error: Model files not found. Please run train.py first.")
@@ -23,13 +26,15 @@ new_complaint = "The internet is very slow in the library and the website is not
 # Complaint ko list mein daalna zaroori hai kyunki model list of inputs leta hai
 complaint_to_predict = [new_complaint]
 
-predicted_category = category_model.predict(complaint_to_predict)[0]
-predicted_priority = priority_model.predict(complaint_to_predict)[0]
-predicted_type = type_model.predict(complaint_to_predict)[0]
-predicted_department = department_model.predict(complaint_to_predict)[0]
+# Text ek baar vectorize hota hai, phir charon heads us se predict karte hain
+prediction = predict(complaint_model, complaint_to_predict)[0]
+predicted_category = prediction['category'][0]
+predicted_priority = prediction['priority'][0]
+predicted_type = prediction['type'][0]
+predicted_department = prediction['department'][0]
 
 # Confidence Score (Optional, but good to have)
-category_confidence = category_model.predict_proba(complaint_to_predict).max() * 100
+category_confidence = prediction['category'][1] * 100
 
 # --- Step 4: Result Print Karein ---
 print("\n" + "="*30)
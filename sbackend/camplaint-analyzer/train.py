@@ -1,11 +1,38 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, classification_report
+from sklearn.pipeline import Pipeline
+import argparse
 import joblib
 import os
+import sys
+import tempfile
+import time
+
+# The compiled-model exporter is shared with the main backend service
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+from services.compiled_model import DTYPES, CompiledModel, agreement, export, print_agreement
+from services.complaint_model import predict
+from services.model_registry import REGISTRY_DIR, publish
+
+parser = argparse.ArgumentParser(description="Train the complaint model")
+parser.add_argument('--featurizer', choices=('tfidf', 'hashing'), default='tfidf',
+                    help="tfidf: vocabulary learned from the data (default); hashing: a fixed number "
+                         "of hashed columns, so the model's size does not grow with the vocabulary")
+parser.add_argument('--n-features', type=int, default=2 ** 14,
+                    help="Hashed columns for --featurizer hashing (default: 16384)")
+parser.add_argument('--compare', action='store_true',
+                    help="Train both featurizers on the same split and report accuracy, size and latency; "
+                         "saves nothing")
+parser.add_argument('--dtype', choices=DTYPES, default='float64',
+                    help="Precision of the compiled idf and weights (default: float64); float32 halves "
+                         "their memory and load time, float16 quarters them")
+parser.add_argument('--no-publish', action='store_true',
+                    help="Only save to models/, without adding a version to models/registry")
+args = parser.parse_args()
 
 print("Training script started...")
 
@@ -48,67 +75,130 @@ print(f"Successfully loaded {len(df)} total complaints from {len(dfs)} dataset(s
 
 X = df['complaint_text']
 
-# --- Step 2: Train Category Model ---
-print("\n--- Training Category Model ---")
-y_category = df['category']
-X_train_cat, X_test_cat, y_train_cat, y_test_cat = train_test_split(X, y_category, test_size=0.2, random_state=42)
-category_model = Pipeline([
-    ('tfidf', TfidfVectorizer(stop_words='english', ngram_range=(1,2))),
-    ('clf', MultinomialNB(alpha=0.1)),
-])
-category_model.fit(X_train_cat, y_train_cat)
-y_pred_cat = category_model.predict(X_test_cat)
-print(f"Category Model Accuracy: {accuracy_score(y_test_cat, y_pred_cat):.2f}")
-
-
-# --- Step 3: Train Priority Model ---
-print("\n--- Training Priority Model ---")
-y_priority = df['priority']
-X_train_pri, X_test_pri, y_train_pri, y_test_pri = train_test_split(X, y_priority, test_size=0.2, random_state=42)
-priority_model = Pipeline([
-    ('tfidf', TfidfVectorizer(stop_words='english', ngram_range=(1,2))),
-    ('clf', MultinomialNB(alpha=0.5)),
-])
-priority_model.fit(X_train_pri, y_train_pri)
-y_pred_pri = priority_model.predict(X_test_pri)
-print(f"Priority Model Accuracy: {accuracy_score(y_test_pri, y_pred_pri):.2f}")
-
-
-# --- Step 4: Train Type Model ---
-print("\n--- Training Type Model ---")
-y_type = df['type']
-X_train_type, X_test_type, y_train_type, y_test_type = train_test_split(X, y_type, test_size=0.2, random_state=42)
-type_model = Pipeline([
-    ('tfidf', TfidfVectorizer(stop_words='english', ngram_range=(1,2))),
-    ('clf', MultinomialNB(alpha=0.5)),
-])
-type_model.fit(X_train_type, y_train_type)
-y_pred_type = type_model.predict(X_test_type)
-print(f"Type Model Accuracy: {accuracy_score(y_test_type, y_pred_type):.2f}")
-
-
-# --- Step 5: Train Department Model (YAHAN NAYA CODE ADD HUA HAI) ---
-print("\n--- Training Department Model ---")
-y_department = df['department']
-X_train_dept, X_test_dept, y_train_dept, y_test_dept = train_test_split(X, y_department, test_size=0.2, random_state=42)
-department_model = Pipeline([
-    ('tfidf', TfidfVectorizer(stop_words='english', ngram_range=(1,2))),
-    ('clf', MultinomialNB(alpha=0.1)),
-])
-department_model.fit(X_train_dept, y_train_dept)
-y_pred_dept = department_model.predict(X_test_dept)
-print(f"Department Model Accuracy: {accuracy_score(y_test_dept, y_pred_dept):.2f}")
-
-
-# --- Step 6: Save All Models ---
+# Every model uses the same split (same rows, same random_state), so one
+# vectorizer fit on the training text serves all four classifier heads.
+X_train, X_test = train_test_split(X, test_size=0.2, random_state=42)
+
+
+def make_vectorizer(featurizer):
+    """TF-IDF features from a learned vocabulary, or from hashed columns.
+
+    The hashing variant stores no vocabulary: its idf is a dense array of
+    --n-features values and each head has that many rows per class, however
+    many distinct words and bigrams the data has. Both compile for the
+    NumPy scorer (backend/services/compiled_model.py).
+    """
+    if featurizer == 'hashing':
+        return Pipeline([
+            ('hashing', HashingVectorizer(stop_words='english', ngram_range=(1,2), n_features=args.n_features,
+                                          alternate_sign=False, norm=None)),
+            ('tfidf', TfidfTransformer()),
+        ])
+    return TfidfVectorizer(stop_words='english', ngram_range=(1,2))
+
+
+def train_head(name, column, alpha, X_train_vec, X_test_vec):
+    """Fit one MultinomialNB head on the shared TF-IDF features."""
+    print(f"\n--- Training {name} Model ---")
+    y_train, y_test = df.loc[X_train.index, column], df.loc[X_test.index, column]
+    clf = MultinomialNB(alpha=alpha)
+    clf.fit(X_train_vec, y_train)
+    y_pred = clf.predict(X_test_vec)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"{name} Model Accuracy: {accuracy:.2f}")
+    return clf, accuracy
+
+
+def train(featurizer):
+    """The {'vectorizer', 'heads'} model and each head's test accuracy."""
+    vectorizer = make_vectorizer(featurizer)
+    X_train_vec = vectorizer.fit_transform(X_train)
+    X_test_vec = vectorizer.transform(X_test)
+    heads, accuracies = {}, {}
+    for name, column, alpha in (('Category', 'category', 0.1), ('Priority', 'priority', 0.5),
+                                ('Type', 'type', 0.5), ('Department', 'department', 0.1)):
+        heads[column], accuracies[column] = train_head(name, column, alpha, X_train_vec, X_test_vec)
+    return {'vectorizer': vectorizer, 'heads': heads}, accuracies
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def compare():
+    """Accuracy, artifact size, load time and latency of both featurizers."""
+    texts = list(X_test)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for featurizer in ('tfidf', 'hashing'):
+            model, accuracies = train(featurizer)
+            pickle_path = os.path.join(tmp, f'{featurizer}.pkl')
+            compiled_dir = os.path.join(tmp, featurizer)
+            joblib.dump(model, pickle_path)
+            export(model, compiled_dir)
+            started = time.perf_counter()
+            scorer = CompiledModel(compiled_dir, mmap_mode=None)
+            load_time = time.perf_counter() - started
+            scorer.predict(texts[:1])
+            started = time.perf_counter()
+            for text in texts:
+                scorer.predict([text])
+            latency = (time.perf_counter() - started) / len(texts)
+            report[featurizer] = dict(accuracies, pickle=os.path.getsize(pickle_path) / 1e6,
+                                      compiled=directory_size(compiled_dir) / 1e6,
+                                      rows=len(scorer.weights), load=load_time * 1e3, latency=latency * 1e6)
+
+    print(f"\n--- TF-IDF vs hashing (n_features={args.n_features}), {len(texts)} test texts ---")
+    rows = [(head, f'{head} accuracy', '{:.3f}') for head in ('category', 'priority', 'type', 'department')] + [
+        ('pickle', 'pickle (MB)', '{:.2f}'), ('compiled', 'compiled (MB)', '{:.2f}'),
+        ('rows', 'weight rows', '{:d}'), ('load', 'compiled load (ms)', '{:.1f}'),
+        ('latency', 'one text (us)', '{:.1f}'),
+    ]
+    print(f"{'':<22}{'tfidf':>12}{'hashing':>12}")
+    for key, label, fmt in rows:
+        print(f"{label:<22}{fmt.format(report['tfidf'][key]):>12}{fmt.format(report['hashing'][key]):>12}")
+
+
+if args.compare:
+    compare()
+    sys.exit(0)
+
+# --- Step 2: Train the four classifier heads ---
+complaint_model, _ = train(args.featurizer)
+heads = complaint_model['heads']
+
+
+# --- Step 3: Save the multi-head model ---
 MODELS_DIR = 'models'
 if not os.path.exists(MODELS_DIR):
     os.makedirs(MODELS_DIR)
 
-joblib.dump(category_model, os.path.join(MODELS_DIR, 'category_model.pkl'))
-joblib.dump(priority_model, os.path.join(MODELS_DIR, 'priority_model.pkl'))
-joblib.dump(type_model, os.path.join(MODELS_DIR, 'type_model.pkl'))
-joblib.dump(department_model, os.path.join(MODELS_DIR, 'department_model.pkl')) # Naya model save karein
-
-print(f"\nAll 4 models saved successfully in '{MODELS_DIR}' folder.")
+# A plain dict, so loading it needs nothing beyond scikit-learn
+# (see backend/services/complaint_model.py). Keep it uncompressed: the
+# services memory-map its arrays instead of reading them into each worker.
+joblib.dump(complaint_model, os.path.join(MODELS_DIR, 'complaint_model.pkl'))
+
+# --- Step 4: Compile it for the NumPy scorer the services load first ---
+# Plain .npy arrays and JSON: same predictions, no scikit-learn at serving time
+COMPILED_DIR = os.path.join(MODELS_DIR, 'complaint_model')
+export(complaint_model, COMPILED_DIR, args.dtype)
+
+if args.dtype != 'float64':
+    # Reduced precision must not change any label on the data; report how far
+    # the probabilities (aiConfidence) move
+    texts = list(X)
+    report = agreement(predict(complaint_model, texts), CompiledModel(COMPILED_DIR).predict(texts))
+    print(f"\n--- {args.dtype} vs float64 on {len(texts)} complaints ---")
+    print_agreement(report)
+    if any(row['agreement'] < 1 for row in report.values()):
+        print(f"{args.dtype} weights change some labels; compiling at float64 instead.")
+        export(complaint_model, COMPILED_DIR)
+
+print(f"\nComplaint model ({args.featurizer}, 1 vectorizer, {len(heads)} heads) saved successfully in '{MODELS_DIR}' folder.")
+
+# --- Step 5: Publish it as the active registry version ---
+# Running services pick it up within MODEL_RELOAD_SECONDS, without a restart
+if not args.no_publish:
+    version = publish(os.path.join(MODELS_DIR, REGISTRY_DIR), MODELS_DIR)
+    print(f"Published and activated model version {version}.")
 print("Training script finished.")